@@ -4,6 +4,7 @@ from pathlib import Path
 import hashlib
 import shutil
 import os
+from typing import Iterable, Iterator
 
 @dataclass(frozen=True)
 class Diff:
@@ -19,17 +20,195 @@ def list_files(root: Path) -> set[str]:
     """
     Return relative file paths (posix-style) for all files under root.
     Example: {"a.txt", "sub/b.txt"}
+    Walks with os.scandir, using the cached DirEntry types instead of a stat per path.
     """
     raise NotImplementedError
 
-def diff_dirs(src: str | Path, dst: str | Path) -> Diff:
-    """Compute added/modified/deleted comparing src -> dst."""
+COPY_STRATEGIES = ("auto", "reflink", "copy_file_range", "sendfile", "shutil")
+
+def copy_file(src: Path, dst: Path, *, strategy: str = "auto") -> str:
+    """
+    Copy src to dst (contents, then permission bits and timestamps like shutil.copy2) and
+    return the name of the strategy that moved the data:
+      - "reflink": clone the extents with the FICLONE ioctl (Linux; btrfs/XFS/...), no data copied
+      - "copy_file_range": os.copy_file_range loop, kernel-side and server-side where supported
+      - "sendfile": os.sendfile loop, kernel-side
+      - "shutil": shutil.copyfileobj through userspace buffers
+    "auto" tries them in that order and falls back when one is unavailable on this platform or
+    fails with EXDEV/EOPNOTSUPP/ENOSYS/EINVAL/ENOTTY before any data was written.
+    An explicit strategy does not fall back: the OSError propagates.
+    Unknown strategy names raise ValueError.
+    """
+    raise NotImplementedError
+
+def block_signatures(path: Path, block_size: int = 65536) -> list[tuple[int, str]]:
+    """
+    Split path into block_size blocks (the last may be short) and return (weak, strong) per block:
+    weak is the rsync/Adler-style checksum a + (b << 16), where a = sum of bytes mod 2**16 and
+    b = sum((len - i) * byte) mod 2**16; strong is the hex sha256 of the block.
+    """
+    raise NotImplementedError
+
+def compute_delta(path: Path, signatures: list[tuple[int, str]], block_size: int = 65536) -> Iterator[tuple]:
+    """
+    Describe path in terms of the blocks behind signatures, lazily.
+    Yields ops in order: ("copy", block_index) or ("data", bytes). Adjacent literals are merged,
+    but a literal is yielded as soon as it reaches block_size bytes, so a fully rewritten file
+    streams through in block-sized pieces instead of being held in memory.
+
+    path is read incrementally (about two blocks in memory at a time). A window of block_size
+    rolls over it one byte at a time with the weak checksum updated in O(1); a weak hit is
+    confirmed with the strong hash before emitting a copy, and the window then jumps a full
+    block. A short last block can only match the tail of path.
+    """
+    raise NotImplementedError
+
+def apply_delta(path: Path, delta: Iterable[tuple], block_size: int = 65536) -> int:
+    """
+    Turn path into the file described by delta, consuming it lazily, writing only what changed.
+
+      - the result is built in a temp file in the same directory, first cloned from path with
+        copy_file(strategy="reflink"); a reflink shares extents, so nothing is written yet
+      - ops are laid out from offset 0: a ("copy", i) that lands at i * block_size is already in
+        place in the clone and costs nothing; a copy that moved is read from path and written at
+        its new offset; ("data", b) is written as is; the temp file is then truncated to the final size
+      - when the clone fails (no reflink support, OSError) there is no full copy followed by a patch:
+        the empty temp file is written straight from the ops, copies going kernel-side with
+        os.copy_file_range where available, so every output byte is written exactly once;
+        permission bits are copied with shutil.copymode
+      - the temp file is moved over path with os.replace, so a crash never leaves a half-patched file
+    Returns the number of bytes written to the temp file, i.e. the write amplification of the
+    patch: literals plus moved blocks after a reflink clone, the whole new size without one.
+    """
+    raise NotImplementedError
+
+class HashCache:
+    """
+    Persistent manifest of file digests, keyed by (resolved root, relative posix path).
+    Each entry stores the file's size, st_mtime_ns, st_ino, its file_hash digest and when the
+    entry was recorded (time.time_ns()).
+
+    HashCache(path=None) loads the JSON manifest at path if it exists; path=None keeps it in memory.
+    Safe to share between the worker threads of diff_dirs/sync_dirs.
+    """
+    def __init__(self, path: str | Path | None = None):
+        raise NotImplementedError
+
+    @property
+    def hits(self) -> int:
+        """Number of digest() calls answered from the manifest."""
+        raise NotImplementedError
+
+    @property
+    def misses(self) -> int:
+        """Number of digest() calls that had to hash the file."""
+        raise NotImplementedError
+
+    def digest(self, root: Path, rel: str) -> str:
+        """
+        Return the digest of root/rel. If its (size, mtime_ns, inode) match the entry, reuse the
+        stored digest; otherwise hash the file and store the new entry.
+        An entry whose mtime_ns is within one second of when it was recorded is racily clean: a
+        same-size write in the same timestamp tick would leave its stat unchanged, so it is hashed
+        again (a miss) and re-recorded instead of trusted.
+        """
+        raise NotImplementedError
+
+    def record(self, root: Path, rel: str, digest: str) -> None:
+        """Store digest for root/rel under the file's current stat (e.g. right after copying it)."""
+        raise NotImplementedError
+
+    def forget(self, root: Path, rel: str) -> None:
+        """Drop the entry for root/rel, if any."""
+        raise NotImplementedError
+
+    def save(self) -> None:
+        """Write the manifest atomically (temp file + os.replace); no-op without a path."""
+        raise NotImplementedError
+
+def diff_dirs(src: str | Path, dst: str | Path, *, cache: HashCache | None = None,
+              workers: int | None = None) -> Diff:
+    """
+    Compute added/modified/deleted comparing src -> dst.
+
+    Metadata first: a file present on both sides with different sizes is modified without
+    being hashed. Only same-size files are compared by digest, through cache.digest when a
+    cache is given, so files whose stat didn't change since the last run are never re-read.
+    Saving the cache is left to the caller.
+
+    workers=None or 1 runs sequentially. workers=N > 1 walks src and dst concurrently and
+    hashes on a pool of N threads (hashlib releases the GIL on large buffers); at most 2*N
+    files are in flight so memory stays flat. The result is the same Diff either way.
+    workers < 1 raises ValueError.
+    """
     raise NotImplementedError
 
-def sync_dirs(src: str | Path, dst: str | Path, *, delete_extra: bool = False) -> Diff:
+def sync_dirs(src: str | Path, dst: str | Path, *, delete_extra: bool = False,
+              cache: HashCache | None = None, workers: int | None = None,
+              delta: bool = False, block_size: int = 65536,
+              copy_strategy: str = "auto") -> Diff:
     """
     Copy added/modified files from src into dst, creating directories as needed.
     If delete_extra=True, delete files in dst that aren't in src.
     Return the Diff that was applied.
+
+    With a cache: each copied file's dst entry is recorded with the src digest when one was
+    computed (and forgotten otherwise), deleted files are forgotten, and the cache is saved.
+
+    workers is passed to diff_dirs and also bounds the pool that copies (and deletes) files.
+    Parent directories are created before the copies are submitted.
+
+    delta=True transfers modified files block-wise: block_signatures of the dst file,
+    compute_delta against src, apply_delta, then copy src's stat onto the result. Added files
+    are still copied whole. The returned Diff is the same as with delta=False.
+
+    Whole-file copies go through copy_file(strategy=copy_strategy).
     """
     raise NotImplementedError
+
+class SyncWatcher:
+    """
+    Keeps dst mirrored from src, applying only the src paths that changed instead of
+    rescanning both trees.
+
+      - __init__ runs one full sync_dirs(src, dst, delete_extra=delete_extra) and indexes src in
+        memory: rel path -> (size, mtime_ns, inode) for files, plus the mtime_ns of every directory
+      - poll() -> Diff: collects changed src paths from the backend, copies added/modified files to
+        dst (copy_file), deletes removed ones when delete_extra=True, updates the index and returns
+        the Diff applied (empty when nothing changed); a file whose stat changed is modified, it is
+        not hashed
+      - racy entries: a file or directory whose mtime is within one second of when it was indexed
+        is looked at again on the next poll (the directory re-listed, the file compared with dst by
+        file_hash), so edits inside one timestamp tick are not lost
+      - backend="poll": re-lists only directories whose mtime changed (entries created, removed or
+        renamed) and stats the indexed files to catch in-place edits
+      - backend="inotify": watches every src directory through inotify via ctypes (create, modify,
+        close_write, delete, moved_from/to) and adds watches for new directories; poll() drains the
+        pending events without blocking; the queue overflowing (IN_Q_OVERFLOW) falls back to one
+        full diff_dirs
+      - backend="auto" uses inotify when libc provides inotify_init1, else poll; any other value
+        raises ValueError
+      - dst is owned by the watcher: edits made directly in dst are not noticed
+      - start(): applies changes in a daemon thread; changes are batched and applied once src has
+        been quiet for debounce seconds, so a burst of writes to one file is copied once;
+        stop(): stops and joins the thread (and closes the inotify fd)
+      - context manager: __exit__ calls stop()
+    """
+    def __init__(self, src: str | Path, dst: str | Path, *, delete_extra: bool = False,
+                 debounce: float = 0.2, backend: str = "auto"):
+        raise NotImplementedError
+
+    def poll(self) -> Diff:
+        raise NotImplementedError
+
+    def start(self) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self) -> SyncWatcher:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -33,8 +33,108 @@ class KVStore:
     Add:
     dump(now=None): returns a JSON string representing all non-expired keys (use json)
     load(json_str): replaces the store with the contents (no TTL on loaded values)
+    
+    Level 5: Expiry index and reaping
+    
+    Keep an index of TTL'd keys ordered by expiry time (e.g. a heapq min-heap of
+    (expires_at, key) pairs) so expired entries can be found without scanning the store.
+    Overwriting, deleting or loading a key leaves its old index entry stale; stale
+    entries must be skipped, never used to evict a live key.
+    
+    Add:
+    reap(now, budget=None):
+        removes expired keys (expires_at <= now) from memory, earliest expiry first
+        removes at most budget keys (all expired keys if budget is None)
+        returns the number of keys removed
+    keys(now) & dump(now) reap before listing, so their cost follows the number of
+    live keys rather than every key ever set
+    
+    Level 6: Ordered key index
+    
+    Keep keys in an incrementally maintained sorted index updated by set/delete/load,
+    so keys() no longer sorts the whole store on every call. Keys are strings.
+    set/delete update it in O(log n), so a flat list kept ordered with bisect is not
+    enough (its insert/del shift O(n) items); use a B-tree-style structure, or a
+    sorted list of bounded-size sublists with a positional index over them.
+    
+    Add:
+    range(start, end, now=None):
+        lazily yields keys with start <= key < end in ascending order
+        start=None / end=None leave that side unbounded
+    prefix(p, now=None):
+        lazily yields keys starting with p in ascending order
+    Both are iterators (not lists) and skip expired keys.
+    
+    Level 7: Bounded memory and eviction
+    
+    KVStore(max_entries=None, max_bytes=None, policy="lru"):
+        None means unbounded; an entry's size in bytes is
+        len(key.encode("utf-8")) + len(json.dumps(value).encode("utf-8"))
+        after set/compare_and_set/load, evict entries until both limits hold;
+        the key just written is never the victim
+        a single entry larger than max_bytes raises ValueError (store unchanged)
+        policy is one of:
+            "lru": least recently used first (get, set and compare_and_set are uses)
+            "lfu": fewest uses first, ties broken by least recently used
+            "ttl": soonest expires_at first; keys without TTL go last, in LRU order
+        unknown policy -> ValueError
+        expired keys are dropped before any live key is evicted
+        get/set stay O(1) for "lru"/"lfu" (e.g. OrderedDict, frequency buckets);
+        "ttl" may reuse the Level 5 heap and pay O(log n)
+    
+    Add:
+    stats(): returns {"hits": int, "misses": int, "evictions": int, "expirations": int}
+        hits/misses count get() calls that found / didn't find a live key
+        evictions count live keys removed to respect the limits
+        expirations count expired keys removed (by reads, reap or before evicting)
+    
+    Level 8: Write-ahead log and snapshots
+    
+    Optional durability on top of the in-memory store. A durable store lives in a
+    directory holding snapshot.json and wal.log.
+    
+    Add:
+    KVStore.open(directory, group_commit=64, compact_every=10_000, **kwargs) (classmethod):
+        creates the directory if needed; kwargs go to KVStore(...)
+        recovery: load snapshot.json (if present), then replay wal.log in order
+        a torn final log line (partial write before a crash) is ignored
+        after replaying a non-empty log, open() checkpoints, so new records are
+        never appended behind a torn line
+    every set/delete/compare_and_set that changes the store appends one JSON line to
+    wal.log, e.g. {"op": "set", "key": ..., "value": ..., "expires_at": ...} or
+    {"op": "delete", "key": ...}; expires_at is absolute, so TTLs survive restarts
+    group commit: records are buffered and written + fsync'ed together once
+    group_commit records are pending
+    flush(): writes and fsyncs pending records
+    checkpoint(): flushes, writes all live entries (with expires_at) to snapshot.json
+        atomically (temp file + os.replace), then truncates wal.log
+        runs automatically once compact_every records were logged since the last one
+    load(json_str) on a durable store checkpoints instead of logging the document
+    close(): checkpoints, then closes the log
+    Evictions are logged as {"op": "delete", "key": ...} records right after the
+    record that caused them, because reads are not logged and replay can't rebuild
+    the LRU/LFU order that chose the victim. Replay therefore applies records as
+    they are and does not evict; expirations are not logged (expires_at is).
+    Recency and use counts are not persisted: after open() keys rank in
+    snapshot/log order.
+    
+    Level 9: Streaming export/import
+    
+    dump()/load() hold the whole document as one string. Add streaming variants that
+    use constant extra memory, working on binary file objects:
+    dump_to(fileobj, now=None, compress=None):
+        writes non-expired entries one per line (JSON Lines) in key order:
+            {"key": ..., "value": ..., "expires_at": ...}
+        compress is None or "gzip" (anything else -> ValueError)
+        returns the number of entries written
+    load_from(fileobj):
+        replaces the store with the entries read line by line, keeping expires_at
+        gzip input is detected by its magic bytes
+        follows the same rules as load(): Level 7 limits are enforced as entries
+        arrive (so memory stays bounded by max_entries/max_bytes), and on a durable
+        store it checkpoints once loading finishes instead of logging each entry
     """
-    def __init__(self):
+    def __init__(self, max_entries=None, max_bytes=None, policy="lru"):
         # TODO
         raise NotImplementedError
 
@@ -65,3 +165,107 @@ class KVStore:
     def load(self, json_str):
         # TODO
         raise NotImplementedError
+
+    def reap(self, now, budget=None):
+        # TODO
+        raise NotImplementedError
+
+    def range(self, start, end, now=None):
+        # TODO
+        raise NotImplementedError
+
+    def prefix(self, p, now=None):
+        # TODO
+        raise NotImplementedError
+
+    def stats(self):
+        # TODO
+        raise NotImplementedError
+
+    @classmethod
+    def open(cls, directory, group_commit=64, compact_every=10_000, **kwargs):
+        # TODO
+        raise NotImplementedError
+
+    def flush(self):
+        # TODO
+        raise NotImplementedError
+
+    def checkpoint(self):
+        # TODO
+        raise NotImplementedError
+
+    def close(self):
+        # TODO
+        raise NotImplementedError
+
+    def dump_to(self, fileobj, now=None, compress=None):
+        # TODO
+        raise NotImplementedError
+
+    def load_from(self, fileobj):
+        # TODO
+        raise NotImplementedError
+
+
+class ConcurrentKVStore:
+    """
+    Implement a thread-safe class ConcurrentKVStore in kvstore.py.
+    
+    Keys are sharded across `stripes` KVStore instances, each guarded by its own
+    threading.Lock (stripe index = hash(key) % stripes), so operations on unrelated
+    keys rarely contend. stripes < 1 raises ValueError.
+    
+    Level 1: Single-key operations
+    
+    set, get, delete, keys, compare_and_set with the same signatures and semantics
+    as KVStore levels 1-3; each call is atomic
+    keys(now=None) returns the sorted union of all shards
+    
+    Level 2: Batch operations
+    
+    mget(keys, now=None): returns a list of values (None if missing) in the order of keys,
+        read as one consistent snapshot
+    mset(mapping, ttl_seconds=None, now=None): writes every pair; readers see all or none
+    multi_compare_and_set(ops, now=None):
+        ops maps key -> (expected, new_value)
+        all-or-nothing: returns True and sets every key iff each current value == expected
+    
+    Batch operations lock only the stripes they touch, acquiring them in ascending
+    stripe index order (and releasing in reverse), so concurrent batches can't deadlock.
+    """
+    def __init__(self, stripes=16):
+        # TODO
+        raise NotImplementedError
+
+    def set(self, key, value, ttl_seconds=None, now=None):
+        # TODO
+        raise NotImplementedError
+
+    def get(self, key, now=None):
+        # TODO
+        raise NotImplementedError
+
+    def delete(self, key):
+        # TODO
+        raise NotImplementedError
+
+    def keys(self, now=None):
+        # TODO
+        raise NotImplementedError
+
+    def compare_and_set(self, key, expected, new_value, now=None):
+        # TODO
+        raise NotImplementedError
+
+    def mget(self, keys, now=None):
+        # TODO
+        raise NotImplementedError
+
+    def mset(self, mapping, ttl_seconds=None, now=None):
+        # TODO
+        raise NotImplementedError
+
+    def multi_compare_and_set(self, ops, now=None):
+        # TODO
+        raise NotImplementedError
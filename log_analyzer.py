@@ -2,7 +2,10 @@ from __future__ import annotations
 from dataclasses import dataclass
 import shlex
 import math
+import os
+import timeit
 from collections import Counter
+from typing import Iterable, Iterator
 
 @dataclass(frozen=True)
 class LogEntry:
@@ -10,17 +13,155 @@ class LogEntry:
     level: str
     fields: dict[str, str]
 
-def parse_line(line: str) -> LogEntry:
+def parse_line_shlex(line: str) -> LogEntry:
     """
     Format (tokens parsed with shlex.split):
       <timestamp> <LEVEL> key=value key=value ...
     Values may be quoted, e.g. msg="hello world"
+    Each key=value token is split at its first '='; tokens without '=' are ignored.
 
     Example:
       2026-01-27T12:00:00Z INFO action=login user=alice ip=1.2.3.4 latency_ms=123 msg="hi there"
+
+    Reference tokenizer: simple but slow (pure-Python shlex). Kept to check parse_line against.
+    """
+    raise NotImplementedError
+
+def parse_line(line: str) -> LogEntry:
+    """
+    Same format and output as parse_line_shlex, without calling shlex:
+      - tokens are separated by runs of ' ', '\\t', '\\r', '\\n' only, like shlex; other whitespace
+        (e.g. '\\x0c', '\\x85', '\\xa0') is an ordinary token character, so str.split() can't be used
+      - fast path: a line with no quote (' ") or backslash characters is split with a precompiled
+        re.split on that separator set
+      - otherwise a precompiled regex scanner applies POSIX shlex rules:
+        'single' quotes are literal, inside "double" quotes a backslash escapes only
+        a backslash or a double quote, outside quotes it escapes any next character
+      - an unterminated quote raises ValueError, as shlex.split does
     """
     raise NotImplementedError
 
+def benchmark_parsers(lines: list[str], repeat: int = 5) -> dict[str, float]:
+    """
+    Micro-benchmark: best-of-`repeat` seconds to parse all `lines` with each parser.
+    Returns {"shlex": seconds, "fast": seconds}.
+    """
+    parsers = {"shlex": parse_line_shlex, "fast": parse_line}
+    results = {}
+    for name, parse in parsers.items():
+        results[name] = min(timeit.repeat(lambda: [parse(line) for line in lines], number=1, repeat=repeat))
+    return results
+
+def split_chunks(path: str | os.PathLike, chunk_size: int = 64 * 1024 * 1024) -> list[tuple[int, int]]:
+    """
+    Split a file into byte ranges (start, end) of roughly chunk_size bytes for parallel parsing.
+      - ranges are contiguous, in file order, and cover the whole file
+      - each range is extended to end just after the next b"\\n" (or at EOF), so no line is split
+      - empty file -> []
+      - chunk_size < 1 -> ValueError
+    """
+    raise NotImplementedError
+
+class LatencySketch:
+    """
+    Mergeable quantile sketch for non-negative latencies (HDR-histogram style, log-scale buckets).
+
+      - LatencySketch(relative_accuracy=0.01); accuracy a must satisfy 0 < a < 1 else ValueError
+      - add(value): with gamma = (1 + a) / (1 - a), a value v >= 1 is counted in bucket ceil(log_gamma(v));
+        values <= 0 (negative latency_ms values do parse) share one zero bucket, kept apart from
+        bucket index 0 (which holds v = 1)
+      - count -> number of values added; bucket_count -> number of non-empty buckets
+      - quantile(p) -> int | None using the same nearest-rank rule as LogAnalyzer.latency_percentile;
+        the answer is the rank's bucket midpoint 2 * gamma**i / (gamma + 1) rounded to int, so it is within
+        a of the exact answer (before rounding); a rank that falls in the zero bucket returns 0, which has
+        no midpoint; p=0 / p=100 return the exact min / max (possibly negative); None if empty
+      - merge(other) adds other's buckets into self; different accuracies -> ValueError
+
+    Memory follows the value range (log_gamma(max)), not the number of values.
+    """
+    def __init__(self, relative_accuracy: float = 0.01):
+        raise NotImplementedError
+
+    @property
+    def count(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def bucket_count(self) -> int:
+        raise NotImplementedError
+
+    def add(self, value: int) -> None:
+        raise NotImplementedError
+
+    def quantile(self, p: float) -> int | None:
+        raise NotImplementedError
+
+    def merge(self, other: LatencySketch) -> None:
+        raise NotImplementedError
+
+class Follower:
+    """
+    Tails a growing log file into a LogAnalyzer; created by LogAnalyzer.follow(...).
+
+      - poll() -> int: reads the bytes appended since the last poll, ingests the complete lines in batches
+        of batch_size and returns the number of entries ingested; a trailing partial line is kept
+        until its newline arrives
+      - rotation: when path names a different file than the open one (st_dev / st_ino changed), the rest
+        of the old file is drained first, then the new file is read from offset 0
+      - truncation: when the file is shorter than the read offset, reading restarts at offset 0
+        and any buffered partial line is dropped
+      - a missing file is not an error: poll() returns 0 until the file appears
+      - start(): calls poll() every poll_interval seconds in a daemon thread, so queries reflect new lines
+        within about poll_interval; stop(): stops and joins the thread
+      - context manager: __exit__ calls stop()
+    """
+    def __init__(self, analyzer: LogAnalyzer, path: str | os.PathLike, poll_interval: float = 0.5,
+                 batch_size: int = 1000, from_start: bool = True):
+        raise NotImplementedError
+
+    def poll(self) -> int:
+        raise NotImplementedError
+
+    def start(self) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self) -> Follower:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+class EntryView:
+    """
+    Row handle into a LogAnalyzer's columns (Level 9); __slots__ = ("_analyzer", "_row"), so a view
+    costs two references and no per-row dict.
+
+      - timestamp, level: decoded from their columns on access
+      - get(field, default=None) -> the field's value decoded on access, without building a fields dict
+      - to_entry() -> LogEntry, equal to analyzer.entry(row)
+    """
+    __slots__ = ("_analyzer", "_row")
+
+    def __init__(self, analyzer: LogAnalyzer, row: int):
+        raise NotImplementedError
+
+    @property
+    def timestamp(self) -> str:
+        raise NotImplementedError
+
+    @property
+    def level(self) -> str:
+        raise NotImplementedError
+
+    def get(self, field: str, default: str | None = None) -> str | None:
+        raise NotImplementedError
+
+    def to_entry(self) -> LogEntry:
+        raise NotImplementedError
+
 class LogAnalyzer:
     """
     Level 1:
@@ -39,24 +180,171 @@ class LogAnalyzer:
     Level 4:
       - filter(level=None, field=None, value=None) -> list[LogEntry]
         (field/value match exact string)
+
+    Level 5:
+      - ingest_stream(source) -> int (number of entries ingested)
+        * source is an iterable of lines, or a path (str / os.PathLike) read lazily as UTF-8
+        * trailing newlines are stripped, blank lines skipped
+        * never materializes the whole input
+      - aggregates are maintained incrementally as lines arrive (level Counter, one Counter
+        per field, latency values), so count_levels/top_values/most_common read them
+        instead of rescanning entries; ingest(lines) goes through the same path
+
+    Level 6:
+      - LogAnalyzer(latency_mode="exact", relative_accuracy=0.01)
+        * "exact": keep every latency value (default, as in Level 3)
+        * "sketch": keep only a LatencySketch, constant memory
+        * "both": keep both, for correctness checks of the sketch
+        * any other mode -> ValueError
+      - latency_percentile(p, exact=None)
+        * exact=None: use the sketch when there is one, else the raw values
+        * exact=True needs raw values, exact=False needs a sketch; otherwise ValueError
+      - latency_sketch() -> a copy of the analyzer's LatencySketch (None in "exact" mode),
+        so sketches from several analyzers can be merged
+
+    Level 7:
+      - inverted index built during ingest: posting lists of entry positions (ascending, i.e.
+        ingestion order) per level and per (field, value)
+      - filter(...) answers by intersecting the relevant postings, shortest first,
+        instead of scanning every entry; results stay in ingestion order
+      - iter_filter(level=None, field=None, value=None) -> Iterator[LogEntry]
+        yields the same matches as filter(...) lazily
+
+    Level 8:
+      - merge(other) -> None
+        * appends other's entries after this analyzer's and combines every partial aggregate
+          (level counts, field Counters, latency values / sketch, postings shifted by len(entries))
+        * other must use the same latency_mode and relative_accuracy, else ValueError
+      - ingest_files(paths, workers=None, chunk_size=64 MiB) -> int (number of entries ingested)
+        * each file is cut with split_chunks; chunks are parsed into partial LogAnalyzers
+          in a concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        * partials are merged in (file, offset) order, so the result equals calling
+          ingest_stream on each path in turn
+        * workers=1 parses in-process without a pool
+
+    Level 9:
+      - columnar storage instead of one LogEntry (and fields dict) per line:
+        * field names interned once (sys.intern) and numbered
+        * timestamp, level and each field's values dictionary-encoded: every distinct string is
+          stored once and columns hold integer codes in array.array("i") (-1 = field missing);
+          Level 12 approximate fields are the exception
+        * merge() remaps other's codes into this analyzer's dictionaries
+      - len(analyzer) -> number of entries
+      - entry(i) -> LogEntry materialized from the columns (negative i allowed, IndexError out of range);
+        equal strings materialize as the same object
+      - the Level 5 aggregates become per-code counters (one count per code of each column, bumped at
+        ingest), so count_levels/top_values/most_common stay O(distinct values) and never scan the
+        columns; they keep counting rows that Level 10 retention later drops. Columns serve storage,
+        entry(i), view(i) and filtering only
+      - view(i) -> EntryView over row i (same indexing rules as entry(i)), decoding nothing up front;
+        filter/iter_filter walk views and materialize LogEntry objects for matches only
+
+    Level 10:
+      - LogAnalyzer(..., rollup="minute", retention_seconds=None); rollup is "minute" or "hour", else ValueError
+      - timestamps are parsed as ISO-8601 to epoch seconds: a trailing "Z" or an explicit offset is honoured,
+        and naive timestamps (no zone) are taken as UTC, never host local time; every entry is
+        also added to its time bucket's rollup: level Counter, field Counters and a LatencySketch
+        (with the analyzer's relative_accuracy); entries with unparseable timestamps are not rolled up
+      - since / until are ISO-8601 strings (parsed the same way) or epoch seconds; a window covers every bucket that
+        overlaps [since, until), so answers have bucket granularity
+        * count_levels(since=None, until=None)
+        * top_values(field, n=3, since=None, until=None)
+        * latency_percentile(p, exact=None, since=None, until=None) (windows always use bucket sketches)
+        windowed queries merge bucket rollups instead of rescanning entries; without a window
+        the queries behave as before
+      - retention_seconds: after each ingest, raw entries older than (newest timestamp - retention_seconds)
+        are dropped, so len/entry/filter no longer see them; rollups and unwindowed aggregates keep them
+      - merge(other) also merges other's bucket rollups into this analyzer's, bucket by bucket, then applies
+        retention as after an ingest; other must use the same rollup and retention_seconds, else ValueError.
+        ingest_files builds its partials with this analyzer's settings, so its windows match sequential ingest
+
+    Level 11:
+      - follow(path, poll_interval=0.5, batch_size=1000, from_start=True, start=True) -> Follower
+        * from_start=False skips what the file already holds
+        * start=True starts the follower's background thread
+      - ingestion and queries are serialized by an internal threading.Lock, so queries can run while a
+        follower ingests and always see whole batches
+      - the lock is not pickled: __getstate__ returns the state without it and __setstate__ creates a
+        fresh one, so partial analyzers can still be returned from the Level 8 process pool
+
+    Level 12:
+      - LogAnalyzer(..., approx_fields=None): maps field -> capacity (int >= 1, else ValueError);
+        such a field is counted with the Space-Saving algorithm in capacity counters instead of
+        one exact Counter entry per distinct value
+        * an untracked value arriving when all counters are in use takes over the counter with the
+          smallest count (ties: largest value) and gets that count + 1
+        * error bound, with N values seen for the field: a reported count c satisfies
+          true <= c <= true + N // capacity, and every value with true count > N / capacity is reported
+        * approx_error(field) -> the current worst-case overestimate (the smallest counter once all are
+          in use, else 0; 0 for exact fields)
+        * top_values/most_common keep the count desc, value asc order over the tracked counts, and
+          return at most capacity pairs
+        * bucket rollups hold summaries of the same capacity, merged as mergeable summaries
+          (Agarwal et al.) so windows keep the same bound; merge() requires equal approx_fields
+        * approximate fields get no (field, value) postings: filter on them scans entries
+        * approximate fields are not dictionary-encoded either: their column is a plain list of the
+          parsed strings (None = missing) with no str -> code map, so memory no longer grows with the
+          number of distinct values beyond the raw column; entry(i) reads them back from that list
     """
-    def __init__(self):
+    def __init__(self, latency_mode: str = "exact", relative_accuracy: float = 0.01,
+                 rollup: str = "minute", retention_seconds: float | None = None,
+                 approx_fields: dict[str, int] | None = None):
         raise NotImplementedError
 
     def ingest(self, lines: list[str]) -> None:
         raise NotImplementedError
 
-    def count_levels(self) -> dict[str, int]:
+    def ingest_stream(self, source: Iterable[str] | str | os.PathLike) -> int:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
         raise NotImplementedError
 
-    def top_values(self, field: str, n: int = 3) -> list[tuple[str, int]]:
+    def entry(self, i: int) -> LogEntry:
+        raise NotImplementedError
+
+    def view(self, i: int) -> EntryView:
+        raise NotImplementedError
+
+    def merge(self, other: LogAnalyzer) -> None:
+        raise NotImplementedError
+
+    def __getstate__(self) -> dict:
+        raise NotImplementedError
+
+    def __setstate__(self, state: dict) -> None:
+        raise NotImplementedError
+
+    def follow(self, path: str | os.PathLike, poll_interval: float = 0.5, batch_size: int = 1000,
+               from_start: bool = True, start: bool = True) -> Follower:
+        raise NotImplementedError
+
+    def ingest_files(self, paths: Iterable[str | os.PathLike], workers: int | None = None,
+                     chunk_size: int = 64 * 1024 * 1024) -> int:
+        raise NotImplementedError
+
+    def count_levels(self, since: str | float | None = None, until: str | float | None = None) -> dict[str, int]:
+        raise NotImplementedError
+
+    def top_values(self, field: str, n: int = 3, since: str | float | None = None,
+                   until: str | float | None = None) -> list[tuple[str, int]]:
         raise NotImplementedError
 
     def most_common(self, field: str) -> str | None:
         raise NotImplementedError
 
-    def latency_percentile(self, p: float) -> int | None:
+    def approx_error(self, field: str) -> int:
+        raise NotImplementedError
+
+    def latency_percentile(self, p: float, exact: bool | None = None, since: str | float | None = None,
+                           until: str | float | None = None) -> int | None:
+        raise NotImplementedError
+
+    def latency_sketch(self) -> LatencySketch | None:
         raise NotImplementedError
 
     def filter(self, level: str | None = None, field: str | None = None, value: str | None = None) -> list[LogEntry]:
         raise NotImplementedError
+
+    def iter_filter(self, level: str | None = None, field: str | None = None, value: str | None = None) -> Iterator[LogEntry]:
+        raise NotImplementedError
@@ -2,20 +2,54 @@ from __future__ import annotations
 import argparse
 import re
 import sys
-from typing import TextIO
+from typing import BinaryIO, Iterator, Sequence, TextIO
+
+def _int_at_least(minimum: int):
+    """argparse type: an int >= minimum, so bad counts end in parser.error (exit 2)."""
+    def convert(text: str) -> int:
+        try:
+            value = int(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid int value: {text!r}") from None
+        if value < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, got {value}")
+        return value
+    return convert
 
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(prog="minigrep")
-    p.add_argument("pattern")
-    p.add_argument("file")
+    p.add_argument("pattern", nargs="?", help="Pattern; with -e/-f the first positional is a file")
+    p.add_argument("files", nargs="*", metavar="file")
+    p.add_argument("-e", dest="patterns", action="append", default=[], metavar="PATTERN",
+                   help="Search for PATTERN (repeatable)")
+    p.add_argument("-f", dest="pattern_file", metavar="PATTERNFILE",
+                   help="Read patterns from PATTERNFILE, one per line (blank lines ignored)")
     p.add_argument("--ignore-case", action="store_true")
     p.add_argument("--regex", action="store_true", help="Treat pattern as regex")
     p.add_argument("--count", action="store_true")
     p.add_argument("--line-numbers", action="store_true")
+    p.add_argument("-r", "--recursive", action="store_true", help="Search directories recursively")
+    p.add_argument("--include", action="append", default=[], metavar="GLOB",
+                   help="Only search files whose name matches GLOB (repeatable)")
+    p.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                   help="Skip files whose name matches GLOB (repeatable)")
+    p.add_argument("--jobs", type=_int_at_least(1), default=1, metavar="N", help="Search files in N worker processes")
+    p.add_argument("-A", "--after-context", type=_int_at_least(0), metavar="NUM", help="Print NUM lines after each match")
+    p.add_argument("-B", "--before-context", type=_int_at_least(0), metavar="NUM", help="Print NUM lines before each match")
+    p.add_argument("-C", "--context", type=_int_at_least(0), default=0, metavar="NUM",
+                   help="Print NUM lines around each match (-A/-B take precedence)")
+    p.add_argument("-m", "--max-count", type=_int_at_least(1), metavar="NUM", help="Stop reading a file after NUM matching lines")
+    p.add_argument("-o", "--only-matching", action="store_true", help="Print only the matched parts of lines")
+    p.add_argument("-q", "--quiet", action="store_true",
+                   help="Print no matches; exit on the first match (errors still go to stderr)")
+    p.add_argument("-s", "--no-messages", action="store_true", help="Suppress errors about unreadable files")
     return p
 
-def run(pattern: str, file: str, *, ignore_case: bool, regex: bool, count: bool, line_numbers: bool,
-        stdout: TextIO, stderr: TextIO) -> int:
+def run(pattern: str | Sequence[str], file: str | Sequence[str], *, ignore_case: bool, regex: bool, count: bool, line_numbers: bool,
+        stdout: TextIO, stderr: TextIO, recursive: bool = False, include: Sequence[str] = (),
+        exclude: Sequence[str] = (), jobs: int = 1, before_context: int = 0, after_context: int = 0,
+        max_count: int | None = None, only_matching: bool = False, quiet: bool = False,
+        no_messages: bool = False) -> int:
     """
     Behavior:
       - Read file as UTF-8 text (errors='replace')
@@ -25,20 +59,217 @@ def run(pattern: str, file: str, *, ignore_case: bool, regex: bool, count: bool,
       - If count=True: print just the number of matching lines and newline
       - Else: print each matching line; if line_numbers=True prefix 'N:' (1-based)
       - Exit code: 0 if at least one match else 1
+
+    Multiple patterns:
+      - pattern is one pattern or a sequence of patterns; a line matches if any of them matches
+      - regex=False with two or more patterns: they all go into one AhoCorasick automaton, one pass
+        per line (or buffer) however many patterns there are; ignore_case folds through the
+        automaton's table instead of lowercasing every line. A single literal never uses the
+        pure-Python automaton: it stays on C-level search (see iter_matches)
+      - regex=True: patterns are compiled once as a single alternation (?:p1)|(?:p2)|...
+
+    Multiple files:
+      - file is one path or a sequence of paths, searched in the order given
+      - recursive=True walks directories depth-first with entries sorted by name; without it a
+        directory is an error
+      - include / exclude are fnmatch globs on the file name: a file is searched if it matches
+        some include glob (when any are given) and no exclude glob
+      - When several files may be searched (more than one path, or recursive=True) every output line
+        is prefixed with 'path:' (so 'path:N:line' with line numbers); count prints 'path:N' per file
+      - jobs > 1: files are searched in a concurrent.futures.ProcessPoolExecutor(jobs) whose initializer
+        compiles the pattern once per worker, and the parent writes results in file order, so output
+        is identical to jobs=1 (jobs < 1 -> ValueError). Memory stays bounded whatever a file prints:
+        a worker returns rendered output of up to 1 MiB directly and spills anything larger to a
+        tempfile.NamedTemporaryFile whose path it returns; the parent copies spilled output with
+        shutil.copyfileobj and deletes the file, and keeps at most 2 * jobs files submitted but not
+        yet written
+      - A file that can't be read prints 'minigrep: path: <reason>' to stderr and the search goes on;
+        the exit code is then 2. no_messages=True (-s) suppresses the message but not the exit code
+
+    Output control:
+      - before_context / after_context: also print up to N lines before / after each matching line.
+        The lines come from iter_context, so the scan loop still allocates nothing for non-matching
+        lines far from a match and only printed lines are decoded
+      - Context lines use '-' where matching lines use ':' ('N-line', 'path-line', 'path-N-line');
+        overlapping or adjacent groups merge, other groups are separated by a '--' line
+      - max_count=N: stop reading a file right after its N-th matching line (the trailing
+        after-context of that line is still printed); count prints at most N. max_count is passed
+        down to the engine functions, which stop reading there
+      - only_matching: print each matched span on its own line, with the usual prefixes, instead of
+        the whole line; context is not printed. Spans come from AhoCorasick.finditer for literal
+        patterns and re.finditer for regexes (empty matches are skipped)
+      - quiet: print nothing to stdout and stop at the first matching line; the exit code is 0 if
+        anything matched, even when another file couldn't be read. Errors for files read before the
+        first match still go to stderr unless no_messages is also set (-q -s is fully silent)
+
+    Compressed input:
+      - .gz / .bz2 / .xz files, recognized by suffix or by magic bytes, are searched transparently
+        through open_input's streaming decompressor; nothing is decompressed to disk
+      - Line numbers refer to the decompressed text; prefixes show the compressed file's path
+      - With jobs > 1 every file is searched, decompression included, in its own worker process,
+        so several archives decompress in parallel
+      - A corrupt archive is reported like an unreadable file ('minigrep: path: <reason>', exit 2)
+
+    Engine:
+      - Search the file through iter_matches / count_matches, passing a pattern sequence through
+        as-is so the automaton / alternation is built by the engine; never read or decode the whole file
+      - Only matching lines are decoded (UTF-8, errors='replace')
+      - count=True uses count_matches, so no per-line objects are built
+      - before_context / after_context > 0 use iter_context instead of iter_matches
+    """
+    raise NotImplementedError
+
+def iter_matches(file: str, pattern: str | Sequence[str], *, ignore_case: bool, regex: bool,
+                 max_count: int | None = None) -> Iterator[tuple[int, bytes]]:
+    """
+    Streaming search: yield (line_number, line_bytes) for each matching line, 1-based,
+    line_bytes without its b"\\n" / b"\\r\\n" terminator; a last line without newline still counts.
+
+      - pattern is one pattern or a sequence of patterns, as in run(); a line matches if any of them
+        does and an empty sequence matches nothing. Two or more literals are searched together
+        through one AhoCorasick automaton (built over bytes on the fast path, over str on the text
+        path); a single literal (or a one-item sequence) is searched with bytes.find / str.find, or
+        with ignore_case as a compiled re.escape(pattern) with re.IGNORECASE, so it stays in C.
+        Regexes are compiled once as a single alternation (?:p1)|(?:p2)|...
+      - Scan a read-only mmap of the file; when it can't be mapped (empty file, pipe, compressed
+        input, ...) read 1 MiB chunks from open_input(file) instead, carrying the partial last line over
+      - Byte fast path when every pattern is ASCII-safe: a literal ASCII pattern, or an ASCII regex
+        without '.', '$', \\A \\Z, lookarounds ((?= (?! (?<= (?<!), \\w \\W \\s \\S \\d \\D \\b \\B
+        or negated sets (their meaning changes on a multi-line buffer of raw, unstripped bytes),
+        and without escapes that name a non-ASCII character: \\u, \\U, \\N{...} (bad escapes in a
+        bytes pattern) and \\x80-\\xff or octal \\200-\\377, alone or as set ranges (a bytes pattern
+        would match that raw byte instead of the character's UTF-8 encoding);
+        with ignore_case the pattern must also avoid the letters i, k and s in either case, which
+        text matching folds with non-ASCII characters (İ, ı, the Kelvin sign K, ſ) that a bytes
+        pattern can't match. Search whole buffers with bytes.find / a compiled bytes regex
+        (re.MULTILINE) and jump from hit to hit
+      - Other patterns are matched on text decoded incrementally (codecs incremental decoder,
+        errors='replace') in the same large chunks
+      - A buffer-level hit is confirmed against the line it starts in. Whether or not that line
+        matches, the search resumes at the start of the next line (never at the hit's end), so a
+        hit spanning several lines can't hide a real match on the following line. With these
+        rules the fast path yields exactly the lines the text path would
+      - max_count=N: stop reading right after the N-th matching line
+    """
+    raise NotImplementedError
+
+def iter_context(file: str, pattern: str | Sequence[str], *, ignore_case: bool, regex: bool,
+                 before: int = 0, after: int = 0,
+                 max_count: int | None = None) -> Iterator[tuple[int, bool, bytes]]:
+    """
+    iter_matches plus context: yield (line_number, is_match, line_bytes) for every matching line and
+    up to `before` / `after` lines around it, in file order and each line once. A jump in line_number
+    marks a gap between groups (where run prints '--').
+
+      - Matches are found exactly as in iter_matches (same buffers, fast path and confirmation);
+        before-lines lie between hits, so they are known not to match and never go through the matcher
+      - mmap input: before-lines are found by scanning back from the hit with rfind(b"\\n"), stopping
+        at the last line already yielded, so nothing is kept for lines far from a match
+      - chunked input (open_input, compressed files, pipes): earlier chunks are gone, so when a buffer
+        is finished the last `before` lines of it are kept as bytes in a collections.deque(maxlen=before)
+        (one rfind walk per buffer, not per line) and before-context reaches back into it across
+        the boundary
+      - after a match the next `after` lines are yielded as context unless they match themselves,
+        in which case they are matches and extend the window
+      - max_count=N: stop after the N-th matching line and its trailing after-context; lines in that
+        trailing context are yielded with is_match=False even if they would match
+    """
+    raise NotImplementedError
+
+def open_input(file: str) -> BinaryIO:
+    """
+    Open file for binary reading, decompressing on the fly when it is compressed:
+      - gzip (.gz or b"\\x1f\\x8b"), bzip2 (.bz2 or b"BZh"), xz (.xz or b"\\xfd7zXZ\\x00")
+        via gzip.open / bz2.open / lzma.open; magic bytes win over the suffix
+      - anything else: open(file, "rb")
     """
     raise NotImplementedError
 
+def count_matches(file: str, pattern: str | Sequence[str], *, ignore_case: bool, regex: bool,
+                  max_count: int | None = None) -> int:
+    """
+    Number of matching lines, found like iter_matches but counted from hit offsets only.
+    With max_count=N the count stops, and reading ends, at N.
+    """
+    raise NotImplementedError
+
+class AhoCorasick:
+    """
+    Multi-literal matcher: an Aho–Corasick automaton (trie + failure links) over the patterns.
+
+      - AhoCorasick(patterns, ignore_case=False); patterns are all str or all bytes and the
+        searched text must be the same type
+      - search(text) -> bool: True if any pattern occurs in text, in one left-to-right pass
+      - an empty pattern occurs everywhere (like "" in text)
+      - ignore_case: characters fold by the case-insensitive equivalence classes re.IGNORECASE
+        uses, not just upper/lower pairs: k, K and the Kelvin sign K form one class, as do s, S, ſ
+        and i, I, İ, ı (bytes patterns fold ASCII letters only). A fold table built from the
+        patterns' alphabet maps every member of each class to one representative, transitions are
+        built on patterns mapped through it, and input characters outside it map straight to the
+        root, so text is never lowercased
+    """
+    def __init__(self, patterns: Sequence[str] | Sequence[bytes], ignore_case: bool = False):
+        raise NotImplementedError
+
+    def search(self, text: str | bytes) -> bool:
+        raise NotImplementedError
+
+    def finditer(self, text: str | bytes) -> Iterator[tuple[int, int]]:
+        """
+        Yield (start, end) spans of non-overlapping matches, left to right: at each position the
+        leftmost match wins, and among matches starting there the longest; scanning resumes at end.
+        Empty patterns are skipped here.
+        """
+        raise NotImplementedError
+
 def main(argv=None) -> int:
-    args = build_parser().parse_args(argv)
+    parser = build_parser()
+    # pattern/files are optional positionals, so options between them need intermixed parsing;
+    # intermixed parsing mishandles '--', so everything after it is split off as positionals first
+    argv = list(sys.argv[1:] if argv is None else argv)
+    tail = []
+    if "--" in argv:
+        cut = argv.index("--")
+        argv, tail = argv[:cut], argv[cut + 1:]
+    args = parser.parse_intermixed_args(argv)
+    if tail:
+        if args.pattern is None:
+            args.pattern, tail = tail[0], tail[1:]
+        args.files = [*args.files, *tail]
+    files = args.files
+    pattern = args.pattern
+    if args.patterns or args.pattern_file:
+        if pattern is not None:
+            files = [pattern, *files]
+        pattern = list(args.patterns)
+        if args.pattern_file:
+            try:
+                with open(args.pattern_file, encoding="utf-8") as f:
+                    pattern += [line for line in f.read().splitlines() if line]
+            except OSError as e:
+                print(f"minigrep: {args.pattern_file}: {e.strerror}", file=sys.stderr)
+                return 2
+    if pattern is None or not files:
+        parser.error("a pattern and at least one file are required")
     return run(
-        args.pattern,
-        args.file,
+        pattern,
+        files,
         ignore_case=args.ignore_case,
         regex=args.regex,
         count=args.count,
         line_numbers=args.line_numbers,
         stdout=sys.stdout,
         stderr=sys.stderr,
+        recursive=args.recursive,
+        include=args.include,
+        exclude=args.exclude,
+        jobs=args.jobs,
+        before_context=args.context if args.before_context is None else args.before_context,
+        after_context=args.context if args.after_context is None else args.after_context,
+        max_count=args.max_count,
+        only_matching=args.only_matching,
+        quiet=args.quiet,
+        no_messages=args.no_messages,
     )
 
 if __name__ == "__main__":
@@ -1,8 +1,12 @@
 import unittest
 from pathlib import Path
+import os
+import random
 import tempfile
+import time
 
-from file_sync import diff_dirs, sync_dirs
+from file_sync import (Diff, diff_dirs, sync_dirs, HashCache, copy_file, SyncWatcher,
+                       block_signatures, compute_delta, apply_delta)
 
 def write(p: Path, text: str):
     p.parent.mkdir(parents=True, exist_ok=True)
@@ -54,5 +58,294 @@ class TestFileSync(unittest.TestCase):
             self.assertEqual(applied.deleted, {"x.txt"})
             self.assertFalse((dst / "x.txt").exists())
 
+class TestHashCache(unittest.TestCase):
+    def make_trees(self, src: Path, dst: Path, age: bool = True) -> int:
+        # age=True backdates mtimes by 10s so the entries aren't racily clean
+        old = time.time_ns() - 10_000_000_000
+        for rel, text in {"a.txt": "AAA", "sub/b.txt": "BBB", "sub/c.txt": "CCC"}.items():
+            for root in (src, dst):
+                write(root / rel, text)
+                if age:
+                    os.utime(root / rel, ns=(old, old))
+        return old
+
+    def test_unchanged_files_are_not_rehashed(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b, \
+                tempfile.TemporaryDirectory() as c:
+            src, dst = Path(a), Path(b)
+            manifest = Path(c) / "manifest.json"
+            self.make_trees(src, dst)
+
+            cache = HashCache(manifest)
+            self.assertEqual(diff_dirs(src, dst, cache=cache), Diff(set(), set(), set()))
+            self.assertEqual((cache.hits, cache.misses), (0, 6))
+            diff_dirs(src, dst, cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (6, 6))
+            cache.save()
+
+            reloaded = HashCache(manifest)
+            diff_dirs(src, dst, cache=reloaded)
+            self.assertEqual((reloaded.hits, reloaded.misses), (6, 0))
+
+    def test_size_change_skips_hashing(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            write(src / "a.txt", "AAA")
+            write(dst / "a.txt", "AAAA")
+            cache = HashCache()
+            self.assertEqual(diff_dirs(src, dst, cache=cache).modified, {"a.txt"})
+            self.assertEqual(cache.misses, 0)
+
+    def test_same_size_edit_in_same_tick_is_detected(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            self.make_trees(src, dst, age=False)
+            cache = HashCache()
+            diff_dirs(src, dst, cache=cache)
+
+            # same size, likely the same mtime tick and inode: only the racy check catches it
+            write(src / "sub" / "b.txt", "XYZ")
+            self.assertEqual(diff_dirs(src, dst, cache=cache).modified, {"sub/b.txt"})
+            self.assertEqual((cache.hits, cache.misses), (0, 12))
+
+    def test_sync_records_copied_digests(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            old = self.make_trees(src, dst)
+            cache = HashCache()
+            diff_dirs(src, dst, cache=cache)
+
+            write(src / "sub" / "b.txt", "XYZ")
+            os.utime(src / "sub" / "b.txt", ns=(old + 1_000_000_000, old + 1_000_000_000))
+            self.assertEqual(diff_dirs(src, dst, cache=cache).modified, {"sub/b.txt"})
+            self.assertEqual(cache.misses, 7)
+
+            applied = sync_dirs(src, dst, cache=cache)
+            self.assertEqual(applied.modified, {"sub/b.txt"})
+            self.assertEqual((dst / "sub" / "b.txt").read_text(encoding="utf-8"), "XYZ")
+            misses = cache.misses
+            self.assertEqual(diff_dirs(src, dst, cache=cache), Diff(set(), set(), set()))
+            self.assertEqual(cache.misses, misses)
+
+class TestParallelSync(unittest.TestCase):
+    def make_trees(self, src: Path, dst: Path):
+        for i in range(40):
+            rel = f"d{i % 5}/sub{i % 3}/f{i}.txt"
+            write(src / rel, f"file {i}\n" * (i + 1))
+            if i % 4 == 0:
+                continue                                # added
+            if i % 4 == 1:
+                write(dst / rel, f"FILE {i}\n" * (i + 1))  # same size, different content
+            elif i % 4 == 2:
+                write(dst / rel, "short")               # different size
+            else:
+                write(dst / rel, f"file {i}\n" * (i + 1))  # unchanged
+        write(dst / "extra" / "gone.txt", "x")
+
+    def test_parallel_diff_matches_sequential(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            self.make_trees(src, dst)
+            expected = diff_dirs(src, dst)
+            self.assertEqual(len(expected.added), 10)
+            self.assertEqual(len(expected.modified), 20)
+            self.assertEqual(expected.deleted, {"extra/gone.txt"})
+            self.assertEqual(diff_dirs(src, dst, workers=4), expected)
+            self.assertEqual(diff_dirs(src, dst, workers=4, cache=HashCache()), expected)
+
+    def test_parallel_sync(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            self.make_trees(src, dst)
+            expected = diff_dirs(src, dst)
+            applied = sync_dirs(src, dst, delete_extra=True, workers=4)
+            self.assertEqual(applied, expected)
+            self.assertEqual(diff_dirs(src, dst, workers=4), Diff(set(), set(), set()))
+            self.assertFalse((dst / "extra" / "gone.txt").exists())
+
+    def test_invalid_workers(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            with self.assertRaises(ValueError):
+                diff_dirs(a, b, workers=0)
+
+class TestDeltaSync(unittest.TestCase):
+    BS = 1024
+
+    def patch(self, dst: Path, new: bytes) -> int:
+        src = dst.with_name("src.bin")
+        src.write_bytes(new)
+        delta = compute_delta(src, block_signatures(dst, self.BS), self.BS)
+        self.assertIs(iter(delta), delta)
+        written = apply_delta(dst, delta, self.BS)
+        self.assertEqual(dst.read_bytes(), new)
+        return written
+
+    def reflinks(self, d: str) -> bool:
+        probe = Path(d) / "probe"
+        probe.write_bytes(b"x")
+        try:
+            copy_file(probe, Path(d) / "probe.clone", strategy="reflink")
+        except OSError:
+            return False
+        return True
+
+    def test_signatures(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.bin"
+            p.write_bytes(b"z" * 1024 + b"\x01\x02\x03")
+            sigs = block_signatures(p, self.BS)
+            self.assertEqual(len(sigs), 2)
+            # a = 1+2+3 = 6, b = 3*1 + 2*2 + 1*3 = 10
+            self.assertEqual(sigs[1][0], 6 + (10 << 16))
+
+    def test_local_edits_write_few_bytes(self):
+        with tempfile.TemporaryDirectory() as d:
+            dst = Path(d) / "dst.bin"
+            old = random.Random(0).randbytes(10 * self.BS + 100)
+            dst.write_bytes(old)
+
+            # blocks that stay at their offset come from the clone and are not rewritten;
+            # without reflinks every byte of the new file is written once, never clone + patch
+            changed = bytearray(old)
+            changed[5 * self.BS + 7] ^= 0xFF
+            new = bytes(changed) + b"appended"
+            bound = self.BS + 100 + len(b"appended") if self.reflinks(d) else len(new)
+            self.assertLessEqual(self.patch(dst, new), bound)
+
+    def test_insertion_is_found_by_rolling_checksum(self):
+        with tempfile.TemporaryDirectory() as d:
+            dst = Path(d) / "dst.bin"
+            src = Path(d) / "src.bin"
+            old = random.Random(0).randbytes(10 * self.BS + 100)
+            dst.write_bytes(old)
+            src.write_bytes(b"1234567" + old)
+            ops = list(compute_delta(src, block_signatures(dst, self.BS), self.BS))
+            self.assertEqual(ops, [("data", b"1234567")] + [("copy", i) for i in range(11)])
+
+    def test_rewritten_file_streams_in_blocks(self):
+        with tempfile.TemporaryDirectory() as d:
+            dst = Path(d) / "dst.bin"
+            dst.write_bytes(random.Random(3).randbytes(5 * self.BS))
+            src = Path(d) / "src.bin"
+            src.write_bytes(random.Random(4).randbytes(5 * self.BS + 10))
+            ops = list(compute_delta(src, block_signatures(dst, self.BS), self.BS))
+            self.assertTrue(all(op == "data" and len(b) <= self.BS for op, b in ops))
+            self.assertEqual(b"".join(b for _, b in ops), src.read_bytes())
+
+    def test_edge_cases(self):
+        with tempfile.TemporaryDirectory() as d:
+            dst = Path(d) / "dst.bin"
+            dst.write_bytes(b"")
+            self.assertEqual(self.patch(dst, b"fresh"), 5)
+            self.assertEqual(self.patch(dst, b"fresh"), 0 if self.reflinks(d) else 5)
+            self.assertEqual(self.patch(dst, b""), 0)
+
+    def test_sync_dirs_delta(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            base = random.Random(1).randbytes(8 * self.BS)
+            (src / "big.bin").write_bytes(base[:3000] + b"edit" + base[3004:] + b"tail")
+            (dst / "big.bin").write_bytes(base)
+            write(src / "new.txt", "N")
+
+            applied = sync_dirs(src, dst, delta=True, block_size=self.BS)
+            self.assertEqual(applied, Diff({"new.txt"}, {"big.bin"}, set()))
+            self.assertEqual((dst / "big.bin").read_bytes(), (src / "big.bin").read_bytes())
+            self.assertEqual(diff_dirs(src, dst), Diff(set(), set(), set()))
+
+class TestCopyFile(unittest.TestCase):
+    def check_copy(self, strategy: str) -> str:
+        with tempfile.TemporaryDirectory() as d:
+            src, dst = Path(d) / "src.bin", Path(d) / "dst.bin"
+            data = random.Random(2).randbytes(3 * 1024 * 1024 + 17)
+            src.write_bytes(data)
+            os.chmod(src, 0o640)
+            os.utime(src, ns=(1_000_000_000, 2_000_000_000))
+            dst.write_bytes(b"stale contents that are longer than nothing")
+
+            used = copy_file(src, dst, strategy=strategy)
+            self.assertEqual(dst.read_bytes(), data)
+            self.assertEqual(os.stat(dst).st_mode & 0o777, 0o640)
+            self.assertEqual(os.stat(dst).st_mtime_ns, 2_000_000_000)
+
+            empty = Path(d) / "empty"
+            empty.write_bytes(b"")
+            copy_file(empty, dst, strategy=used)
+            self.assertEqual(dst.read_bytes(), b"")
+            return used
+
+    def test_auto(self):
+        self.assertIn(self.check_copy("auto"), ("reflink", "copy_file_range", "sendfile", "shutil"))
+
+    def test_shutil(self):
+        self.assertEqual(self.check_copy("shutil"), "shutil")
+
+    @unittest.skipUnless(hasattr(os, "copy_file_range"), "needs os.copy_file_range")
+    def test_copy_file_range(self):
+        self.assertEqual(self.check_copy("copy_file_range"), "copy_file_range")
+
+    def test_unknown_strategy(self):
+        with tempfile.TemporaryDirectory() as d:
+            write(Path(d) / "a", "A")
+            with self.assertRaises(ValueError):
+                copy_file(Path(d) / "a", Path(d) / "b", strategy="teleport")
+
+    def test_sync_dirs_copy_strategy(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            write(src / "a.txt", "AAA")
+            write(src / "sub" / "b.txt", "BBB")
+            sync_dirs(src, dst, copy_strategy="shutil")
+            self.assertEqual(diff_dirs(src, dst), Diff(set(), set(), set()))
+
+class TestSyncWatcher(unittest.TestCase):
+    def make_src(self, src: Path):
+        write(src / "a.txt", "AAA")
+        write(src / "b.txt", "BBB")
+        write(src / "sub" / "c.txt", "CCC")
+
+    def test_poll_applies_changes(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            self.make_src(src)
+            write(dst / "stale.txt", "S")
+            w = SyncWatcher(src, dst, delete_extra=True, backend="poll")
+            self.assertFalse((dst / "stale.txt").exists())
+            self.assertEqual(diff_dirs(src, dst), Diff(set(), set(), set()))
+            self.assertEqual(w.poll(), Diff(set(), set(), set()))
+
+            write(src / "a.txt", "AAAA")
+            (src / "b.txt").unlink()
+            write(src / "new" / "x.txt", "X")
+            self.assertEqual(w.poll(), Diff({"new/x.txt"}, {"a.txt"}, {"b.txt"}))
+            self.assertEqual(diff_dirs(src, dst), Diff(set(), set(), set()))
+            self.assertEqual(w.poll(), Diff(set(), set(), set()))
+
+    def test_poll_keeps_extra_without_delete(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            self.make_src(src)
+            w = SyncWatcher(src, dst, backend="poll")
+            (src / "sub" / "c.txt").unlink()
+            self.assertEqual(w.poll(), Diff(set(), set(), set()))
+            self.assertTrue((dst / "sub" / "c.txt").exists())
+
+    def test_background_sync(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            src, dst = Path(a), Path(b)
+            self.make_src(src)
+            with SyncWatcher(src, dst, debounce=0.05, backend="poll") as w:
+                w.start()
+                write(src / "sub" / "d.txt", "DDD")
+                deadline = time.monotonic() + 5
+                while not (dst / "sub" / "d.txt").exists() and time.monotonic() < deadline:
+                    time.sleep(0.02)
+            self.assertEqual((dst / "sub" / "d.txt").read_text(encoding="utf-8"), "DDD")
+
+    def test_invalid_backend(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            with self.assertRaises(ValueError):
+                SyncWatcher(a, b, backend="fsevents")
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,12 @@
 # test_kvstore.py
+import gzip
+import io
 import json
+import os
+import tempfile
+import threading
 import unittest
-from kvstore import KVStore
+from kvstore import ConcurrentKVStore, KVStore
 
 class TestKVStoreLevel1(unittest.TestCase):
     def test_set_get(self):
@@ -95,5 +100,386 @@ class TestKVStoreLevel4DumpLoad(unittest.TestCase):
         obj = json.loads(dumped)
         self.assertEqual(set(obj.keys()), {"a"})
 
+class TestKVStoreLevel5Reap(unittest.TestCase):
+    def test_reap_respects_budget_and_expiry_order(self):
+        s = KVStore()
+        s.set("a", 1, ttl_seconds=30, now=0.0)      # expires at 30
+        s.set("b", 2, ttl_seconds=10, now=0.0)      # expires at 10
+        s.set("c", 3, ttl_seconds=20, now=0.0)      # expires at 20
+        s.set("d", 4, ttl_seconds=None, now=0.0)
+
+        self.assertEqual(s.reap(now=25.0, budget=1), 1)
+        # "b" expired first, so it is gone even when read "in the past"
+        self.assertIsNone(s.get("b", now=0.0))
+        self.assertEqual(s.get("c", now=0.0), 3)
+
+        self.assertEqual(s.reap(now=25.0), 1)
+        self.assertIsNone(s.get("c", now=0.0))
+        self.assertEqual(s.reap(now=25.0), 0)
+        self.assertEqual(s.keys(now=0.0), ["a", "d"])
+
+    def test_reap_skips_stale_index_entries(self):
+        s = KVStore()
+        s.set("a", 1, ttl_seconds=10, now=0.0)
+        s.set("a", 2, ttl_seconds=None, now=5.0)    # no longer expires
+        s.set("b", 1, ttl_seconds=10, now=0.0)
+        s.delete("b")
+        s.set("c", 1, ttl_seconds=10, now=0.0)
+        s.set("c", 2, ttl_seconds=100, now=5.0)     # now expires at 105
+
+        self.assertEqual(s.reap(now=50.0), 0)
+        self.assertEqual(s.get("a", now=50.0), 2)
+        self.assertEqual(s.get("c", now=50.0), 2)
+        self.assertEqual(s.reap(now=105.0), 1)
+        self.assertEqual(s.keys(now=0.0), ["a"])
+
+    def test_keys_and_dump_reap_expired(self):
+        s = KVStore()
+        s.set("a", 1, ttl_seconds=10, now=0.0)
+        s.set("b", 2, ttl_seconds=None, now=0.0)
+        self.assertEqual(s.keys(now=10.0), ["b"])
+        self.assertIsNone(s.get("a", now=0.0))
+
+        s.set("c", 3, ttl_seconds=10, now=0.0)
+        self.assertEqual(set(json.loads(s.dump(now=10.0))), {"b"})
+        self.assertIsNone(s.get("c", now=0.0))
+
+class TestKVStoreLevel6OrderedIndex(unittest.TestCase):
+    def make_store(self):
+        s = KVStore()
+        for k in ["user:2", "order:1", "user:10", "user:1", "session:9", "user"]:
+            s.set(k, k.upper())
+        return s
+
+    def test_range(self):
+        s = self.make_store()
+        it = s.range("session:", "user:2")
+        self.assertIs(iter(it), it)
+        self.assertEqual(list(it), ["session:9", "user", "user:1", "user:10"])
+        self.assertEqual(list(s.range(None, "session:")), ["order:1"])
+        self.assertEqual(list(s.range("user:10", None)), ["user:10", "user:2"])
+        self.assertEqual(list(s.range("x", "y")), [])
+
+    def test_prefix(self):
+        s = self.make_store()
+        it = s.prefix("user:")
+        self.assertIs(iter(it), it)
+        self.assertEqual(list(it), ["user:1", "user:10", "user:2"])
+        self.assertEqual(list(s.prefix("")), s.keys())
+        self.assertEqual(list(s.prefix("zzz")), [])
+
+    def test_index_tracks_updates_and_ttl(self):
+        s = self.make_store()
+        s.delete("user:10")
+        s.set("user:3", 3, ttl_seconds=10, now=0.0)
+        s.set("user:0", 0)
+        self.assertEqual(list(s.prefix("user:", now=5.0)), ["user:0", "user:1", "user:2", "user:3"])
+        self.assertEqual(list(s.prefix("user:", now=10.0)), ["user:0", "user:1", "user:2"])
+        self.assertEqual(list(s.range("user:", "user:9", now=10.0)), ["user:0", "user:1", "user:2"])
+
+        s.load(json.dumps({"b": 1, "a": 2}))
+        self.assertEqual(s.keys(), ["a", "b"])
+        self.assertEqual(list(s.prefix("user")), [])
+
+class TestKVStoreLevel7Eviction(unittest.TestCase):
+    def test_lru_max_entries(self):
+        s = KVStore(max_entries=2)
+        s.set("a", 1)
+        s.set("b", 2)
+        self.assertEqual(s.get("a"), 1)     # "b" is now least recently used
+        s.set("c", 3)
+        self.assertEqual(s.keys(), ["a", "c"])
+        self.assertIsNone(s.get("b"))
+        self.assertEqual(s.stats(), {"hits": 1, "misses": 1, "evictions": 1, "expirations": 0})
+
+    def test_lfu_evicts_least_used_then_least_recent(self):
+        s = KVStore(max_entries=2, policy="lfu")
+        s.set("a", 1)
+        s.set("b", 2)
+        s.get("a")
+        s.get("a")
+        s.get("b")
+        s.set("c", 3)                       # a=3 uses, b=2 uses -> evict b
+        self.assertEqual(s.keys(), ["a", "c"])
+        s.set("d", 4)                       # c=1 use -> evict c
+        self.assertEqual(s.keys(), ["a", "d"])
+
+        t = KVStore(max_entries=2, policy="lfu")
+        t.set("x", 1)
+        t.set("y", 1)
+        t.set("z", 1)                       # tie on uses -> least recent "x"
+        self.assertEqual(t.keys(), ["y", "z"])
+
+    def test_ttl_first_policy(self):
+        s = KVStore(max_entries=2, policy="ttl")
+        s.set("a", 1, ttl_seconds=100, now=0.0)
+        s.set("b", 2, ttl_seconds=50, now=0.0)
+        s.set("c", 3, now=0.0)              # evicts "b": soonest expiry
+        self.assertEqual(s.keys(now=0.0), ["a", "c"])
+        s.set("d", 4, now=0.0)              # TTL'd "a" goes before untimed "c"
+        self.assertEqual(s.keys(now=0.0), ["c", "d"])
+        self.assertEqual(s.stats()["evictions"], 2)
+
+    def test_max_bytes(self):
+        s = KVStore(max_bytes=15)
+        s.set("a", "xxxx")                  # 1 + 6 bytes
+        s.set("b", "yyyy")                  # 1 + 6 bytes
+        s.set("c", "zz")                    # 1 + 4 bytes -> over 15, evict "a"
+        self.assertEqual(s.keys(), ["b", "c"])
+        with self.assertRaises(ValueError):
+            s.set("big", "x" * 100)
+        self.assertEqual(s.keys(), ["b", "c"])
+        self.assertEqual(s.get("b"), "yyyy")
+
+    def test_expired_dropped_before_eviction(self):
+        s = KVStore(max_entries=2)
+        s.set("a", 1, ttl_seconds=10, now=0.0)
+        s.set("b", 2, now=0.0)
+        s.set("c", 3, now=20.0)
+        self.assertEqual(s.keys(now=20.0), ["b", "c"])
+        st = s.stats()
+        self.assertEqual(st["evictions"], 0)
+        self.assertEqual(st["expirations"], 1)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            KVStore(max_entries=1, policy="random")
+
+class TestKVStoreLevel8WAL(unittest.TestCase):
+    def log_lines(self, d):
+        with open(os.path.join(d, "wal.log"), encoding="utf-8") as f:
+            return [line for line in f.read().splitlines() if line]
+
+    def test_recovery_replays_log(self):
+        with tempfile.TemporaryDirectory() as d:
+            s = KVStore.open(d)
+            s.set("a", 1)
+            s.set("b", {"x": 1}, ttl_seconds=10, now=0.0)
+            s.delete("a")
+            self.assertTrue(s.compare_and_set("c", None, 3, now=0.0))
+            self.assertFalse(s.compare_and_set("c", None, 4, now=0.0))
+            s.close()
+
+            t = KVStore.open(d)
+            self.assertIsNone(t.get("a"))
+            self.assertEqual(t.get("b", now=5.0), {"x": 1})
+            self.assertIsNone(t.get("b", now=10.0))
+            self.assertEqual(t.get("c"), 3)
+            t.close()
+
+    def test_group_commit_buffers_records(self):
+        with tempfile.TemporaryDirectory() as d:
+            s = KVStore.open(d, group_commit=3)
+            s.set("a", 1)
+            s.set("b", 2)
+            self.assertEqual(self.log_lines(d), [])
+            s.set("c", 3)
+            self.assertEqual(len(self.log_lines(d)), 3)
+            s.set("d", 4)
+            s.flush()
+            self.assertEqual(len(self.log_lines(d)), 4)
+            s.close()
+
+    def test_checkpoint_and_auto_compaction(self):
+        with tempfile.TemporaryDirectory() as d:
+            s = KVStore.open(d, group_commit=1)
+            s.set("a", 1)
+            s.set("b", 2, ttl_seconds=10, now=0.0)
+            s.checkpoint()
+            self.assertTrue(os.path.exists(os.path.join(d, "snapshot.json")))
+            self.assertEqual(self.log_lines(d), [])
+            s.set("c", 3)
+            s.close()
+
+            t = KVStore.open(d, group_commit=1, compact_every=2)
+            self.assertEqual(t.keys(now=0.0), ["a", "b", "c"])
+            self.assertEqual(t.get("b", now=5.0), 2)
+            t.set("d", 4)
+            self.assertEqual(len(self.log_lines(d)), 1)
+            t.set("e", 5)                       # second record -> compaction
+            self.assertEqual(self.log_lines(d), [])
+            t.close()
+
+            u = KVStore.open(d)
+            self.assertEqual(u.keys(now=0.0), ["a", "b", "c", "d", "e"])
+            self.assertIsNone(u.get("b", now=10.0))
+            u.close()
+
+    def test_evictions_survive_restart(self):
+        with tempfile.TemporaryDirectory() as d:
+            s = KVStore.open(d, group_commit=1, max_entries=2)
+            s.set("a", 1)
+            s.set("b", 2)
+            self.assertEqual(s.get("a"), 1)     # b is now least recently used
+            s.set("c", 3)
+            self.assertEqual(s.keys(), ["a", "c"])
+
+            crashed = KVStore.open(d, max_entries=2)    # as after a crash: log only
+            self.assertEqual(crashed.keys(), ["a", "c"])
+            crashed.close()
+            s.close()
+
+            t = KVStore.open(d, max_entries=2)
+            self.assertEqual(t.keys(), ["a", "c"])
+            t.close()
+
+    def test_torn_tail_is_ignored(self):
+        with tempfile.TemporaryDirectory() as d:
+            s = KVStore.open(d)
+            s.set("a", 1)
+            s.close()
+            with open(os.path.join(d, "wal.log"), "a", encoding="utf-8") as f:
+                f.write('{"op": "set", "key": "b", "val')
+
+            t = KVStore.open(d)
+            self.assertEqual(t.keys(), ["a"])
+            t.close()
+
+class TestKVStoreLevel9Streaming(unittest.TestCase):
+    def make_store(self):
+        s = KVStore()
+        s.set("b", {"x": [1, 2]}, ttl_seconds=10, now=0.0)
+        s.set("a", 1)
+        s.set("c", "gone", ttl_seconds=5, now=0.0)
+        return s
+
+    def test_dump_to_load_from_roundtrip(self):
+        buf = io.BytesIO()
+        self.assertEqual(self.make_store().dump_to(buf, now=6.0), 2)
+        records = [json.loads(line) for line in buf.getvalue().decode("utf-8").splitlines()]
+        self.assertEqual(records, [
+            {"key": "a", "value": 1, "expires_at": None},
+            {"key": "b", "value": {"x": [1, 2]}, "expires_at": 10.0},
+        ])
+
+        t = KVStore()
+        t.set("z", 999)
+        buf.seek(0)
+        t.load_from(buf)
+        self.assertEqual(t.keys(now=6.0), ["a", "b"])
+        self.assertEqual(t.get("b", now=9.0), {"x": [1, 2]})
+        self.assertIsNone(t.get("b", now=10.0))
+
+    def test_gzip(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "backup.jsonl.gz")
+            with open(path, "wb") as f:
+                self.assertEqual(self.make_store().dump_to(f, now=0.0, compress="gzip"), 3)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(2), b"\x1f\x8b")
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                self.assertEqual(len(f.read().splitlines()), 3)
+
+            t = KVStore()
+            with open(path, "rb") as f:
+                t.load_from(f)
+            self.assertEqual(t.keys(now=0.0), ["a", "b", "c"])
+            self.assertIsNone(t.get("c", now=5.0))
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            self.make_store().dump_to(io.BytesIO(), compress="zip")
+
+    def test_load_from_respects_limits_and_durability(self):
+        buf = io.BytesIO()
+        self.make_store().dump_to(buf, now=0.0)
+        data = buf.getvalue()
+
+        bounded = KVStore(max_entries=2)
+        bounded.load_from(io.BytesIO(data))
+        self.assertEqual(len(bounded.keys(now=0.0)), 2)
+
+        with tempfile.TemporaryDirectory() as d:
+            s = KVStore.open(d)
+            s.load_from(io.BytesIO(data))
+            s.close()
+            t = KVStore.open(d)
+            self.assertEqual(t.keys(now=0.0), ["a", "b", "c"])
+            self.assertEqual(t.get("b", now=9.0), {"x": [1, 2]})
+            t.close()
+
+class TestConcurrentKVStoreLevel1(unittest.TestCase):
+    def test_single_key_ops(self):
+        s = ConcurrentKVStore(stripes=4)
+        s.set("b", 1)
+        s.set("a", 2, ttl_seconds=10, now=0.0)
+        s.set("c", 3)
+        self.assertEqual(s.get("a", now=5.0), 2)
+        self.assertEqual(s.keys(now=5.0), ["a", "b", "c"])
+        self.assertEqual(s.keys(now=10.0), ["b", "c"])
+        self.assertTrue(s.delete("b"))
+        self.assertFalse(s.delete("b"))
+        self.assertTrue(s.compare_and_set("b", None, 7))
+        self.assertFalse(s.compare_and_set("b", None, 8))
+        self.assertEqual(s.get("b"), 7)
+
+    def test_invalid_stripes(self):
+        with self.assertRaises(ValueError):
+            ConcurrentKVStore(stripes=0)
+
+    def test_concurrent_cas_increments(self):
+        s = ConcurrentKVStore(stripes=8)
+        s.set("n", 0)
+
+        def worker():
+            for _ in range(200):
+                while True:
+                    cur = s.get("n")
+                    if s.compare_and_set("n", cur, cur + 1):
+                        break
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(s.get("n"), 1600)
+
+class TestConcurrentKVStoreLevel2Batch(unittest.TestCase):
+    def test_mget_mset(self):
+        s = ConcurrentKVStore(stripes=4)
+        s.mset({"a": 1, "b": 2, "c": 3}, ttl_seconds=10, now=0.0)
+        s.set("d", 4)
+        self.assertEqual(s.mget(["c", "missing", "a", "d"], now=5.0), [3, None, 1, 4])
+        self.assertEqual(s.mget(["a", "d"], now=10.0), [None, 4])
+        self.assertEqual(s.mget([]), [])
+
+    def test_multi_compare_and_set_all_or_nothing(self):
+        s = ConcurrentKVStore(stripes=4)
+        s.mset({"a": 1, "b": 2})
+        self.assertFalse(s.multi_compare_and_set({"a": (1, 10), "b": (99, 20), "c": (None, 30)}))
+        self.assertEqual(s.mget(["a", "b", "c"]), [1, 2, None])
+        self.assertTrue(s.multi_compare_and_set({"a": (1, 10), "b": (2, 20), "c": (None, 30)}))
+        self.assertEqual(s.mget(["a", "b", "c"]), [10, 20, 30])
+
+    def test_concurrent_transfers_preserve_total(self):
+        s = ConcurrentKVStore(stripes=8)
+        accounts = [f"acct{i}" for i in range(4)]
+        s.mset({k: 100 for k in accounts})
+        torn = []
+
+        def mover(i):
+            src, dst = accounts[i % 4], accounts[(i + 1) % 4]
+            for _ in range(200):
+                while True:
+                    a, b = s.mget([src, dst])
+                    if s.multi_compare_and_set({src: (a, a - 1), dst: (b, b + 1)}):
+                        break
+
+        def reader():
+            for _ in range(200):
+                total = sum(s.mget(accounts))
+                if total != 400:
+                    torn.append(total)
+
+        threads = [threading.Thread(target=mover, args=(i,)) for i in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(torn, [])
+        self.assertEqual(s.mget(accounts), [100, 100, 100, 100])
+
 if __name__ == "__main__":
     unittest.main()
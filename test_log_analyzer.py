@@ -1,5 +1,14 @@
+import math
+import os
+import pickle
+import tempfile
+import time
 import unittest
-from log_analyzer import parse_line, LogAnalyzer
+from datetime import datetime, timezone
+from pathlib import Path
+from log_analyzer import (
+    parse_line, parse_line_shlex, benchmark_parsers, split_chunks, LatencySketch, LogAnalyzer,
+)
 
 SAMPLE = [
     '2026-01-27T12:00:00Z INFO action=login user=alice ip=1.1.1.1 latency_ms=120 msg="hello world"',
@@ -10,6 +19,15 @@ SAMPLE = [
     '2026-01-27T12:00:05Z INFO action=logout user=alice ip=1.1.1.1',
 ]
 
+TRICKY = [
+    '2026-01-27T12:00:06Z INFO msg="say \\"hi\\"" path=\'/a b/\' empty=""',
+    '2026-01-27T12:00:07Z DEBUG   a=1\tb=2   flag c=x=y',
+    '2026-01-27T12:00:08Z INFO msg="back\\\\slash" raw=\'it\\s\' esc=a\\ b',
+    '2026-01-27T12:00:09Z WARN msg="multi"part\'s\' x=1',
+    '2026-01-27T12:00:10Z INFO a=x\x0cy b=c\xa0d\x0b c=\x1fz',
+    '2026-01-27T12:00:11Z INFO msg="p q"\x85r e=\x0c',
+]
+
 class TestParseLine(unittest.TestCase):
     def test_parse_basic(self):
         e = parse_line(SAMPLE[0])
@@ -21,6 +39,33 @@ class TestParseLine(unittest.TestCase):
         self.assertEqual(e.fields["latency_ms"], "120")
         self.assertEqual(e.fields["msg"], "hello world")
 
+class TestFastParser(unittest.TestCase):
+    def test_matches_shlex_reference(self):
+        for line in SAMPLE + TRICKY:
+            with self.subTest(line=line):
+                self.assertEqual(parse_line(line), parse_line_shlex(line))
+
+    def test_quoting_rules(self):
+        e = parse_line(TRICKY[0])
+        self.assertEqual(e.fields, {"msg": 'say "hi"', "path": "/a b/", "empty": ""})
+        e = parse_line(TRICKY[1])
+        self.assertEqual(e.level, "DEBUG")
+        self.assertEqual(e.fields, {"a": "1", "b": "2", "c": "x=y"})
+        e = parse_line(TRICKY[2])
+        self.assertEqual(e.fields, {"msg": "back\\slash", "raw": "it\\s", "esc": "a b"})
+        self.assertEqual(parse_line(TRICKY[3]).fields["msg"], "multiparts")
+        self.assertEqual(parse_line(TRICKY[4]).fields, {"a": "x\x0cy", "b": "c\xa0d\x0b", "c": "\x1fz"})
+        self.assertEqual(parse_line(TRICKY[5]).fields, {"msg": "p q\x85r", "e": "\x0c"})
+
+    def test_unterminated_quote(self):
+        with self.assertRaises(ValueError):
+            parse_line('2026-01-27T12:00:00Z INFO msg="oops')
+
+    def test_benchmark(self):
+        result = benchmark_parsers(SAMPLE * 10, repeat=2)
+        self.assertEqual(set(result), {"shlex", "fast"})
+        self.assertTrue(all(t >= 0 for t in result.values()))
+
 class TestAnalyzerLevel1(unittest.TestCase):
     def test_count_levels(self):
         a = LogAnalyzer()
@@ -62,5 +107,393 @@ class TestAnalyzerLevel4(unittest.TestCase):
         warn_rate = a.filter(level="WARN", field="action", value="rate_limit")
         self.assertEqual(len(warn_rate), 1)
 
+class TestAnalyzerLevel5Streaming(unittest.TestCase):
+    def test_ingest_stream_from_path(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "app.log"
+            p.write_text("\n".join(SAMPLE[:3]) + "\n\n" + "\n".join(SAMPLE[3:]) + "\n", encoding="utf-8")
+            a = LogAnalyzer()
+            self.assertEqual(a.ingest_stream(p), 6)
+            self.assertEqual(a.ingest_stream(str(p)), 6)
+        self.assertEqual(a.count_levels(), {"INFO": 8, "WARN": 2, "ERROR": 2})
+        self.assertEqual(a.top_values("user", n=5), [("alice", 8), ("bob", 4)])
+        self.assertEqual(a.latency_percentile(50), 120)
+
+    def test_ingest_stream_from_iterator_accumulates(self):
+        a = LogAnalyzer()
+        a.ingest(SAMPLE[:2])
+        self.assertEqual(a.ingest_stream(line + "\n" for line in SAMPLE[2:]), 4)
+        self.assertEqual(a.count_levels(), {"INFO": 4, "WARN": 1, "ERROR": 1})
+        self.assertEqual(a.most_common("action"), "login")
+        self.assertEqual(a.top_values("ip", n=2), [("1.1.1.1", 4), ("2.2.2.2", 2)])
+        self.assertEqual(len(a.filter(field="user", value="bob")), 2)
+        self.assertEqual(a.filter(level="WARN")[0].fields["action"], "rate_limit")
+
+class TestAnalyzerLevel6Sketch(unittest.TestCase):
+    def assertWithin(self, estimate, exact, accuracy):
+        self.assertGreaterEqual(estimate, math.floor(exact * (1 - accuracy)))
+        self.assertLessEqual(estimate, math.ceil(exact * (1 + accuracy)))
+
+    def test_sketch_mode(self):
+        a = LogAnalyzer(latency_mode="sketch")
+        a.ingest(SAMPLE)
+        self.assertEqual(a.latency_percentile(0), 50)
+        self.assertEqual(a.latency_percentile(100), 500)
+        self.assertWithin(a.latency_percentile(50), 120, 0.01)
+        self.assertWithin(a.latency_percentile(95), 500, 0.01)
+        with self.assertRaises(ValueError):
+            a.latency_percentile(50, exact=True)
+
+    def test_both_mode_matches_exact_within_accuracy(self):
+        lines = [f"2026-01-27T12:00:00Z INFO latency_ms={(i * 7919) % 5000 + 1}" for i in range(2000)]
+        a = LogAnalyzer(latency_mode="both", relative_accuracy=0.02)
+        a.ingest(lines)
+        for p in (1, 25, 50, 90, 99, 99.9):
+            with self.subTest(p=p):
+                exact = a.latency_percentile(p, exact=True)
+                self.assertWithin(a.latency_percentile(p), exact, 0.02)
+
+        with self.assertRaises(ValueError):
+            LogAnalyzer().latency_percentile(50, exact=False)
+        with self.assertRaises(ValueError):
+            LogAnalyzer(latency_mode="approx")
+
+    def test_sketch_zero_bucket(self):
+        s = LatencySketch(0.01)
+        for v in (-5, 0, 0, 1, 100):
+            s.add(v)
+        self.assertEqual(s.bucket_count, 3)
+        self.assertEqual(s.quantile(0), -5)
+        self.assertEqual(s.quantile(20), 0)
+        self.assertEqual(s.quantile(60), 0)
+        self.assertEqual(s.quantile(80), 1)
+        self.assertEqual(s.quantile(100), 100)
+
+    def test_sketch_memory_and_merge(self):
+        s = LatencySketch(0.01)
+        for v in range(1, 100_001):
+            s.add(v)
+        self.assertEqual(s.count, 100_000)
+        self.assertLess(s.bucket_count, 700)
+        self.assertWithin(s.quantile(99.9), 99_900, 0.01)
+        self.assertIsNone(LatencySketch().quantile(50))
+
+        a, b = LogAnalyzer(latency_mode="sketch"), LogAnalyzer(latency_mode="sketch")
+        a.ingest(SAMPLE[:3])
+        b.ingest(SAMPLE[3:])
+        merged = a.latency_sketch()
+        merged.merge(b.latency_sketch())
+        self.assertEqual(merged.count, 5)
+        self.assertEqual(merged.quantile(0), 50)
+        self.assertEqual(merged.quantile(100), 500)
+        self.assertWithin(merged.quantile(50), 120, 0.01)
+        self.assertEqual(a.latency_sketch().count, 3)
+        self.assertIsNone(LogAnalyzer().latency_sketch())
+        with self.assertRaises(ValueError):
+            merged.merge(LatencySketch(0.05))
+
+class TestAnalyzerLevel7Index(unittest.TestCase):
+    def test_iter_filter_is_lazy_and_ordered(self):
+        a = LogAnalyzer()
+        a.ingest(SAMPLE)
+        it = a.iter_filter(field="user", value="alice")
+        self.assertIs(iter(it), it)
+        self.assertEqual(next(it).timestamp, "2026-01-27T12:00:00Z")
+        self.assertEqual([e.timestamp[-3:] for e in it], ["03Z", "04Z", "05Z"])
+
+    def test_intersections_match_filter(self):
+        a = LogAnalyzer()
+        a.ingest(SAMPLE)
+        a.ingest(['2026-01-27T12:00:06Z WARN action=login user=alice ip=3.3.3.3'])
+        logins = a.filter(level="INFO", field="action", value="login")
+        self.assertEqual([e.fields["user"] for e in logins], ["alice", "bob", "alice"])
+        self.assertEqual(list(a.iter_filter(level="INFO", field="action", value="login")), logins)
+        self.assertEqual([e.level for e in a.filter(field="user", value="alice")],
+                         ["INFO", "ERROR", "INFO", "INFO", "WARN"])
+        self.assertEqual(a.filter(level="ERROR", field="user", value="bob"), [])
+        self.assertEqual(a.filter(level="DEBUG"), [])
+        self.assertEqual(a.filter(field="user", value="carol"), [])
+        self.assertEqual(len(a.filter()), 7)
+
+class TestAnalyzerLevel8Parallel(unittest.TestCase):
+    def test_split_chunks_align_to_lines(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "app.log"
+            data = ("\n".join(SAMPLE * 5)).encode("utf-8")     # no trailing newline
+            p.write_bytes(data)
+            chunks = split_chunks(p, chunk_size=150)
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(chunks[0][0], 0)
+            self.assertEqual(chunks[-1][1], len(data))
+            for (_, end), (start, _) in zip(chunks, chunks[1:]):
+                self.assertEqual(end, start)
+                self.assertEqual(data[end - 1:end], b"\n")
+            self.assertEqual(b"".join(data[s:e] for s, e in chunks), data)
+
+            empty = Path(d) / "empty.log"
+            empty.write_bytes(b"")
+            self.assertEqual(split_chunks(empty), [])
+            with self.assertRaises(ValueError):
+                split_chunks(p, chunk_size=0)
+
+    def test_merge(self):
+        a, b = LogAnalyzer(), LogAnalyzer()
+        a.ingest(SAMPLE[:3])
+        b.ingest(SAMPLE[3:])
+        a.merge(b)
+        self.assertEqual(a.count_levels(), {"INFO": 4, "WARN": 1, "ERROR": 1})
+        self.assertEqual(a.top_values("ip", n=2), [("1.1.1.1", 4), ("2.2.2.2", 2)])
+        self.assertEqual(a.latency_percentile(50), 120)
+        self.assertEqual([e.timestamp[-3:] for e in a.filter(field="user", value="alice")],
+                         ["00Z", "03Z", "04Z", "05Z"])
+        with self.assertRaises(ValueError):
+            a.merge(LogAnalyzer(latency_mode="sketch"))
+
+    def test_ingest_files_matches_sequential(self):
+        with tempfile.TemporaryDirectory() as d:
+            first, second = Path(d) / "a.log", Path(d) / "b.log"
+            first.write_text("\n".join(SAMPLE * 20) + "\n", encoding="utf-8")
+            second.write_text("\n".join(reversed(SAMPLE)) + "\n", encoding="utf-8")
+
+            expected = LogAnalyzer()
+            expected.ingest_stream(first)
+            expected.ingest_stream(second)
+            for workers in (1, 2):
+                with self.subTest(workers=workers):
+                    a = LogAnalyzer()
+                    self.assertEqual(a.ingest_files([first, second], workers=workers, chunk_size=200), 126)
+                    self.assertEqual(a.count_levels(), expected.count_levels())
+                    self.assertEqual(a.top_values("user", n=5), expected.top_values("user", n=5))
+                    self.assertEqual(a.latency_percentile(90), expected.latency_percentile(90))
+                    self.assertEqual(a.filter(level="WARN"), expected.filter(level="WARN"))
+                    self.assertEqual(a.filter(), expected.filter())
+                    window = dict(since="2026-01-27T12:00:00Z", until="2026-01-27T12:01:00Z")
+                    self.assertEqual(a.count_levels(**window), expected.count_levels(**window))
+                    self.assertEqual(a.count_levels(**window), {"INFO": 84, "WARN": 21, "ERROR": 21})
+                    self.assertEqual(a.top_values("user", n=2, **window), expected.top_values("user", n=2, **window))
+                    self.assertEqual(a.latency_percentile(90, **window), expected.latency_percentile(90, **window))
+
+class TestAnalyzerLevel9Columnar(unittest.TestCase):
+    def test_entries_materialize_from_columns(self):
+        a = LogAnalyzer()
+        a.ingest(SAMPLE)
+        self.assertEqual(len(a), 6)
+        for i, line in enumerate(SAMPLE):
+            self.assertEqual(a.entry(i), parse_line(line))
+        self.assertEqual(a.entry(-1), parse_line(SAMPLE[-1]))
+        self.assertNotIn("latency_ms", a.entry(-1).fields)
+        with self.assertRaises(IndexError):
+            a.entry(6)
+        self.assertEqual(a.filter(level="ERROR"), [parse_line(SAMPLE[3])])
+
+    def test_views(self):
+        a = LogAnalyzer()
+        a.ingest(SAMPLE)
+        v = a.view(-2)
+        self.assertEqual((v.timestamp, v.level), ("2026-01-27T12:00:04Z", "INFO"))
+        self.assertEqual(v.get("user"), "alice")
+        self.assertIsNone(v.get("nope"))
+        self.assertEqual(v.to_entry(), a.entry(4))
+        with self.assertRaises(AttributeError):
+            v.extra = 1
+        with self.assertRaises(IndexError):
+            a.view(6)
+
+    def test_strings_are_shared(self):
+        a = LogAnalyzer()
+        a.ingest(SAMPLE)
+        first, last = a.entry(0), a.entry(4)
+        self.assertIs(first.level, last.level)
+        self.assertIs(first.fields["action"], last.fields["action"])
+        self.assertIs(first.fields["ip"], last.fields["ip"])
+        self.assertIs(next(iter(first.fields)), next(iter(last.fields)))
+
+    def test_merge_remaps_codes(self):
+        a, b = LogAnalyzer(), LogAnalyzer()
+        a.ingest(SAMPLE[:2])
+        b.ingest(['2026-01-27T12:00:09Z DEBUG user=carol action=login', SAMPLE[2]])
+        a.merge(b)
+        self.assertEqual(len(a), 4)
+        self.assertEqual(a.entry(2), parse_line('2026-01-27T12:00:09Z DEBUG user=carol action=login'))
+        self.assertEqual(a.entry(3), parse_line(SAMPLE[2]))
+        self.assertIs(a.entry(2).fields["action"], a.entry(0).fields["action"])
+        self.assertEqual(a.top_values("user", n=3), [("bob", 2), ("alice", 1), ("carol", 1)])
+
+TIMED = [
+    '2026-01-27T12:00:10Z INFO action=login user=alice latency_ms=100',
+    '2026-01-27T12:00:50Z ERROR action=checkout user=bob latency_ms=900',
+    '2026-01-27T12:01:05Z INFO action=login user=bob latency_ms=200',
+    '2026-01-27T12:02:30Z WARN action=rate_limit user=bob latency_ms=300',
+    '2026-01-27T13:00:00Z INFO action=logout user=alice latency_ms=400',
+]
+
+class TestAnalyzerLevel10Windows(unittest.TestCase):
+    def test_minute_windows(self):
+        a = LogAnalyzer()
+        a.ingest(TIMED)
+        self.assertEqual(a.count_levels(since="2026-01-27T12:01:00Z"), {"INFO": 2, "WARN": 1})
+        self.assertEqual(a.count_levels(until="2026-01-27T12:01:00Z"), {"INFO": 1, "ERROR": 1})
+        # bucket granularity: 12:00 overlaps [12:00:30, 12:01:30)
+        self.assertEqual(a.count_levels(since="2026-01-27T12:00:30Z", until="2026-01-27T12:01:30Z"),
+                         {"INFO": 2, "ERROR": 1})
+        start = datetime(2026, 1, 27, 12, 2, tzinfo=timezone.utc).timestamp()
+        self.assertEqual(a.count_levels(since=start, until=start + 60), {"WARN": 1})
+        self.assertEqual(a.count_levels(since="2026-01-28T00:00:00Z"), {})
+        self.assertEqual(a.top_values("user", n=2, until="2026-01-27T12:02:00Z"), [("bob", 2), ("alice", 1)])
+        self.assertEqual(a.count_levels(), {"INFO": 3, "ERROR": 1, "WARN": 1})
+
+    def test_naive_timestamps_are_utc(self):
+        a = LogAnalyzer()
+        a.ingest(['2026-01-27T12:00:10 INFO user=alice', '2026-01-27T13:00:10+01:00 WARN user=bob'])
+        start = datetime(2026, 1, 27, 12, 0, tzinfo=timezone.utc).timestamp()
+        self.assertEqual(a.count_levels(since=start, until=start + 60), {"INFO": 1, "WARN": 1})
+        self.assertEqual(a.count_levels(since="2026-01-27T12:00:00", until="2026-01-27T12:01:00"),
+                         {"INFO": 1, "WARN": 1})
+
+    def test_windowed_latency_and_hour_rollup(self):
+        a = LogAnalyzer(rollup="hour")
+        a.ingest(TIMED)
+        self.assertEqual(a.count_levels(since="2026-01-27T12:30:00Z"), {"INFO": 3, "ERROR": 1, "WARN": 1})
+        self.assertEqual(a.count_levels(since="2026-01-27T13:00:00Z"), {"INFO": 1})
+        self.assertEqual(a.latency_percentile(100, until="2026-01-27T13:00:00Z"), 900)
+        p50 = a.latency_percentile(50, until="2026-01-27T13:00:00Z")
+        self.assertTrue(198 <= p50 <= 202, p50)
+        self.assertEqual(a.latency_percentile(50), 300)
+        with self.assertRaises(ValueError):
+            LogAnalyzer(rollup="day")
+
+    def test_merge_combines_rollups(self):
+        a, b = LogAnalyzer(), LogAnalyzer()
+        a.ingest(TIMED[:2])
+        b.ingest(TIMED[2:])
+        a.merge(b)
+        whole = LogAnalyzer()
+        whole.ingest(TIMED)
+        for since in ("2026-01-27T12:00:00Z", "2026-01-27T12:01:00Z", "2026-01-27T12:02:00Z"):
+            self.assertEqual(a.count_levels(since=since), whole.count_levels(since=since))
+        for kw in (dict(rollup="hour"), dict(retention_seconds=60)):
+            with self.subTest(**kw), self.assertRaises(ValueError):
+                LogAnalyzer().merge(LogAnalyzer(**kw))
+
+    def test_retention_keeps_rollups(self):
+        a = LogAnalyzer(retention_seconds=60)
+        a.ingest(TIMED[:4])
+        # newest is 12:02:30 -> entries before 12:01:30 are dropped
+        self.assertEqual(len(a), 1)
+        self.assertEqual([e.level for e in a.filter()], ["WARN"])
+        self.assertEqual(a.filter(field="user", value="alice"), [])
+        self.assertEqual(a.count_levels(), {"INFO": 2, "ERROR": 1, "WARN": 1})
+        self.assertEqual(a.count_levels(since="2026-01-27T12:00:00Z"), {"INFO": 2, "ERROR": 1, "WARN": 1})
+        self.assertEqual(a.most_common("user"), "bob")
+
+class TestAnalyzerLevel11Follow(unittest.TestCase):
+    def append(self, path, text):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_pickle_drops_lock(self):
+        a = LogAnalyzer()
+        a.ingest(SAMPLE[:2])
+        b = pickle.loads(pickle.dumps(a))
+        self.assertEqual(b.count_levels(), a.count_levels())
+        b.ingest(SAMPLE[2:])
+        self.assertEqual(len(b), len(SAMPLE))
+        self.assertEqual(len(a), 2)
+
+    def test_poll_buffers_partial_lines(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "app.log"
+            p.write_text(SAMPLE[0] + "\n" + SAMPLE[1] + "\n", encoding="utf-8")
+            a = LogAnalyzer()
+            f = a.follow(p, start=False)
+            self.assertEqual(f.poll(), 2)
+            self.assertEqual(f.poll(), 0)
+            self.append(p, SAMPLE[2][:30])
+            self.assertEqual(f.poll(), 0)
+            self.append(p, SAMPLE[2][30:] + "\n" + SAMPLE[3] + "\n")
+            self.assertEqual(f.poll(), 2)
+            self.assertEqual(a.count_levels(), {"INFO": 2, "WARN": 1, "ERROR": 1})
+            self.assertEqual(a.filter(level="WARN")[0].fields["action"], "rate_limit")
+
+    def test_rotation_and_truncation(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "app.log"
+            p.write_text(SAMPLE[0] + "\n", encoding="utf-8")
+            a = LogAnalyzer()
+            f = a.follow(p, start=False)
+            self.assertEqual(f.poll(), 1)
+
+            os.rename(p, Path(d) / "app.log.1")
+            self.append(Path(d) / "app.log.1", SAMPLE[1] + "\n")         # late write to the old file
+            p.write_text(SAMPLE[2] + "\n" + SAMPLE[3] + "\n", encoding="utf-8")
+            self.assertEqual(f.poll(), 3)
+
+            p.write_text(SAMPLE[4] + "\n", encoding="utf-8")           # truncated in place
+            self.assertEqual(f.poll(), 1)
+            self.assertEqual(a.count_levels(), {"INFO": 3, "WARN": 1, "ERROR": 1})
+
+    def test_missing_file_and_from_end(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "app.log"
+            a = LogAnalyzer()
+            f = a.follow(p, start=False)
+            self.assertEqual(f.poll(), 0)
+            p.write_text(SAMPLE[0] + "\n", encoding="utf-8")
+            self.assertEqual(f.poll(), 1)
+
+            b = LogAnalyzer()
+            g = b.follow(p, from_start=False, start=False)
+            self.assertEqual(g.poll(), 0)
+            self.append(p, SAMPLE[3] + "\n")
+            self.assertEqual(g.poll(), 1)
+            self.assertEqual(b.count_levels(), {"ERROR": 1})
+
+    def test_background_thread(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "app.log"
+            p.write_text("", encoding="utf-8")
+            a = LogAnalyzer()
+            with a.follow(p, poll_interval=0.02):
+                self.append(p, "\n".join(SAMPLE) + "\n")
+                deadline = time.monotonic() + 5
+                while sum(a.count_levels().values()) < 6 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(a.count_levels(), {"INFO": 4, "WARN": 1, "ERROR": 1})
+
+class TestAnalyzerLevel12HeavyHitters(unittest.TestCase):
+    def test_exact_while_under_capacity(self):
+        a = LogAnalyzer(approx_fields={"ip": 10, "user": 10})
+        a.ingest(SAMPLE)
+        self.assertEqual(a.top_values("ip", n=2), [("1.1.1.1", 4), ("2.2.2.2", 2)])
+        self.assertEqual(a.top_values("user", n=5), [("alice", 4), ("bob", 2)])
+        self.assertEqual(a.most_common("user"), "alice")
+        self.assertEqual(a.approx_error("ip"), 0)
+        self.assertEqual(a.approx_error("action"), 0)
+        self.assertEqual(len(a.filter(field="user", value="bob")), 2)
+
+    def test_bounded_counters_find_heavy_hitter(self):
+        lines = []
+        for i in range(90):
+            if i % 3 != 2:
+                lines.append("2026-01-27T12:00:00Z INFO ip=10.0.0.1")
+            lines.append(f"2026-01-27T12:00:00Z INFO ip=192.168.0.{i}")
+        a = LogAnalyzer(approx_fields={"ip": 3})
+        a.ingest(lines)                 # N=150: 60 x 10.0.0.1, 90 distinct others
+
+        top = a.top_values("ip", n=10)
+        self.assertLessEqual(len(top), 3)
+        self.assertEqual(top, sorted(top, key=lambda vc: (-vc[1], vc[0])))
+        self.assertEqual(top[0][0], "10.0.0.1")
+        error = a.approx_error("ip")
+        self.assertLessEqual(error, 150 // 3)
+        self.assertTrue(60 <= top[0][1] <= 60 + error)
+        self.assertEqual(a.most_common("ip"), "10.0.0.1")
+        self.assertEqual(len(a.filter(field="ip", value="10.0.0.1")), 60)
+        self.assertEqual(a.entry(-1).fields["ip"], "192.168.0.89")
+
+    def test_invalid_capacity(self):
+        with self.assertRaises(ValueError):
+            LogAnalyzer(approx_fields={"ip": 0})
+
 if __name__ == "__main__":
     unittest.main()
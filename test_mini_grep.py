@@ -2,8 +2,21 @@ import unittest
 import tempfile
 from pathlib import Path
 import io
+import os
+import bz2
+import gzip
+import lzma
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
 
-from mini_grep import main, run
+from mini_grep import main, run, iter_matches, iter_context, count_matches, open_input, AhoCorasick
+
+def grep(pattern, files, **kw):
+    opts = dict(ignore_case=False, regex=False, count=False, line_numbers=False)
+    opts.update(kw)
+    out, err = io.StringIO(), io.StringIO()
+    code = run(pattern, files, stdout=out, stderr=err, **opts)
+    return code, out.getvalue(), err.getvalue()
 
 class TestMiniGrepBasic(unittest.TestCase):
     def test_substring_matches(self):
@@ -73,5 +86,419 @@ class TestMiniGrepOptions(unittest.TestCase):
             self.assertEqual(code, 0)
             self.assertEqual(out.getvalue(), "cat\ncot\ncut\n")
 
+class TestMiniGrepStreaming(unittest.TestCase):
+    def test_only_matching_lines_are_decoded(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.bin"
+            p.write_bytes(b"ok\n\xff\xfe bad match\nno\nmatch\xc3\n")
+            self.assertEqual(grep("match", str(p)), (0, "\ufffd\ufffd bad match\nmatch\ufffd\n", ""))
+            self.assertEqual(grep("match", str(p), line_numbers=True), (0, "2:\ufffd\ufffd bad match\n4:match\ufffd\n", ""))
+
+    def test_line_endings_and_empty_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.txt"
+            p.write_bytes(b"a\r\nba\r\nc\nxa")
+            self.assertEqual(grep("a", str(p), line_numbers=True), (0, "1:a\n2:ba\n4:xa\n", ""))
+            self.assertEqual(list(iter_matches(str(p), "a$", ignore_case=False, regex=True)),
+                             [(1, b"a"), (2, b"ba"), (4, b"xa")])
+
+            e = Path(d) / "empty.txt"
+            e.write_bytes(b"")
+            self.assertEqual(grep("a", str(e)), (1, "", ""))
+            self.assertEqual(grep("a", str(e), count=True), (1, "0\n", ""))
+
+    def test_large_file_count_and_matches(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "big.log"
+            lines = [f"line {i} ok" for i in range(300_000)]
+            for i in (0, 123_456, 299_999):
+                lines[i] = f"line {i} ERROR boom"
+            p.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+            self.assertEqual(count_matches(str(p), "error", ignore_case=True, regex=False), 3)
+            self.assertEqual(count_matches(str(p), r"ERROR\s+bo+m", ignore_case=False, regex=True), 3)
+            hits = list(iter_matches(str(p), "ERROR", ignore_case=False, regex=False))
+            self.assertEqual([n for n, _ in hits], [1, 123_457, 300_000])
+            self.assertEqual(hits[1][1], b"line 123456 ERROR boom")
+            self.assertEqual(grep("ERROR", str(p), count=True), (0, "3\n", ""))
+
+    def test_non_ascii_pattern(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.txt"
+            p.write_text("café\nCAFÉ\ncafe\n", encoding="utf-8")
+            self.assertEqual(grep("é", str(p), ignore_case=True), (0, "café\nCAFÉ\n", ""))
+            self.assertEqual(grep(r"caf.$", str(p), regex=True), (0, "café\ncafe\n", ""))
+
+    def test_fast_path_agrees_with_text_path(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.txt"
+            p.write_text("\u212a\n\u017f\n\u0130\na\nqaz\nb\ncaf\u00e9\n", encoding="utf-8")
+            def lines(pattern, **kw):
+                opts = dict(ignore_case=False, regex=True)
+                opts.update(kw)
+                return [n for n, _ in iter_matches(str(p), pattern, **opts)]
+            self.assertEqual(lines("k", ignore_case=True), [1])
+            self.assertEqual(lines("s", ignore_case=True), [2])
+            self.assertEqual(lines("i", ignore_case=True), [3])
+            self.assertEqual(lines("k", ignore_case=True, regex=False), [1])
+            self.assertEqual(lines("s", ignore_case=True, regex=False), [2])
+            self.assertEqual(lines(["i", "zz"], ignore_case=True, regex=False), [3])
+            self.assertEqual(lines(r"\Aqaz\Z"), [5])
+            self.assertEqual(lines(r"(?<![\n])b"), [6])
+            # the buffer hit "a\nqaz" starts on line 4, fails there and must not skip line 5
+            self.assertEqual(lines(r"a[a-z\n]*z"), [5])
+            # escapes naming a non-ASCII character must not reach a bytes pattern
+            for pattern in (r"caf\u00e9", r"caf\U000000e9", r"caf\N{LATIN SMALL LETTER E WITH ACUTE}",
+                            r"caf\xe9", r"caf\351", r"caf[\x80-\xff]"):
+                with self.subTest(pattern=pattern):
+                    self.assertEqual(lines(pattern), [7])
+            self.assertEqual(lines(r"caf\\xe9"), [])
+
+class TestMiniGrepMultiFile(unittest.TestCase):
+    def make_tree(self, root: Path):
+        for rel, text in {
+            "app.log": "ok\nERROR one\n",
+            "b/old.log": "ERROR two\nERROR three\n",
+            "b/notes.txt": "ERROR in notes\n",
+            "a/skip.log.1": "ERROR rotated\n",
+            "a/z.log": "fine\n",
+        }.items():
+            (root / rel).parent.mkdir(parents=True, exist_ok=True)
+            (root / rel).write_text(text, encoding="utf-8")
+
+    def test_multiple_files_are_prefixed(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.make_tree(Path(d))
+            a, b = os.path.join(d, "b", "old.log"), os.path.join(d, "app.log")
+            code, out, _ = grep("ERROR", [a, b], line_numbers=True)
+            self.assertEqual(code, 0)
+            self.assertEqual(out, f"{a}:1:ERROR two\n{a}:2:ERROR three\n{b}:2:ERROR one\n")
+            _, out, _ = grep("ERROR", [a, b], count=True)
+            self.assertEqual(out, f"{a}:2\n{b}:1\n")
+
+    def test_recursive_with_globs(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.make_tree(Path(d))
+            j = lambda *p: os.path.join(d, *p)
+            code, out, _ = grep("ERROR", [d], recursive=True, count=True, include=["*.log"])
+            self.assertEqual(code, 0)
+            self.assertEqual(out, f"{j('a', 'z.log')}:0\n{j('app.log')}:1\n{j('b', 'old.log')}:2\n")
+
+            _, out, _ = grep("ERROR", [d], recursive=True, exclude=["*.log", "*.txt"])
+            self.assertEqual(out, f"{j('a', 'skip.log.1')}:ERROR rotated\n")
+
+            code, out, err = grep("ERROR", [d])
+            self.assertEqual((code, out), (2, ""))
+            self.assertIn("minigrep: ", err)
+
+    def test_jobs_output_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.make_tree(Path(d))
+            for i in range(20):
+                (Path(d) / "many" / f"f{i:02}.log").parent.mkdir(exist_ok=True)
+                (Path(d) / "many" / f"f{i:02}.log").write_text(f"x\nERROR {i}\n" * (i + 1), encoding="utf-8")
+            serial = grep("ERROR", [d], recursive=True, line_numbers=True)
+            self.assertEqual(grep("ERROR", [d], recursive=True, line_numbers=True, jobs=4), serial)
+            with self.assertRaises(ValueError):
+                grep("ERROR", [d], recursive=True, jobs=0)
+
+    def test_jobs_with_large_output(self):
+        with tempfile.TemporaryDirectory() as d:
+            big = Path(d) / "big.log"
+            big.write_text("".join(f"ERROR {i:06} {'x' * 50}\n" for i in range(30_000)), encoding="utf-8")
+            small = Path(d) / "small.log"
+            small.write_text("ERROR last\n", encoding="utf-8")
+            serial = grep("ERROR", [str(big), str(small)], line_numbers=True)
+            self.assertGreater(len(serial[1]), 1 << 21)
+            self.assertEqual(grep("ERROR", [str(big), str(small)], line_numbers=True, jobs=2), serial)
+
+    def test_main_rejects_bad_counts(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.make_tree(Path(d))
+            for argv in (["--jobs", "0"], ["-A", "-1"], ["-B", "-2"], ["-C", "-1"], ["-m", "0"], ["--jobs", "x"]):
+                with self.subTest(argv=argv):
+                    err = io.StringIO()
+                    with redirect_stderr(err), self.assertRaises(SystemExit) as cm:
+                        main([*argv, "ERROR", d])
+                    self.assertEqual(cm.exception.code, 2)
+                    self.assertIn(argv[0], err.getvalue())
+
+    def test_missing_file_reports_and_continues(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.make_tree(Path(d))
+            missing, ok = os.path.join(d, "nope.log"), os.path.join(d, "app.log")
+            code, out, err = grep("ERROR", [missing, ok])
+            self.assertEqual(code, 2)
+            self.assertEqual(out, f"{ok}:ERROR one\n")
+            self.assertTrue(err.startswith(f"minigrep: {missing}: "))
+
+    def test_main_cli_flags(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.make_tree(Path(d))
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = main(["-r", "--include", "*.txt", "--jobs", "2", "--count", "ERROR", d])
+            self.assertEqual(code, 0)
+            self.assertEqual(buf.getvalue(), f"{os.path.join(d, 'b', 'notes.txt')}:1\n")
+
+class TestMiniGrepMultiPattern(unittest.TestCase):
+    def test_aho_corasick(self):
+        ac = AhoCorasick(["he", "she", "his", "hers"])
+        self.assertTrue(ac.search("ushers"))
+        self.assertTrue(ac.search("this"))
+        self.assertFalse(ac.search("hxs"))
+        self.assertTrue(AhoCorasick(["abcd", "bc"]).search("abce"))     # found via failure link
+        self.assertFalse(AhoCorasick(["abcd"]).search("abcabc"))
+        self.assertTrue(AhoCorasick([b"10.0.0.1", b"10.0.0.2"]).search(b"ip=10.0.0.2 ok"))
+        self.assertTrue(AhoCorasick(["", "zzz"]).search("abc"))
+        self.assertFalse(AhoCorasick([]).search("abc"))
+
+        folded = AhoCorasick(["Hello", "WORLD"], ignore_case=True)
+        self.assertTrue(folded.search("say hELLo"))
+        self.assertTrue(folded.search("the world"))
+        self.assertFalse(folded.search("hell no"))
+        self.assertFalse(AhoCorasick(["Hello"]).search("hello"))
+        # full case-insensitive classes, as re.IGNORECASE: Kelvin sign, long s, dotted/dotless i
+        self.assertTrue(AhoCorasick(["kiss"], ignore_case=True).search("\u212aI\u017fS"))
+        self.assertTrue(AhoCorasick(["\u0130f"], ignore_case=True).search("if"))
+        self.assertFalse(AhoCorasick([b"k"], ignore_case=True).search("\u212a".encode()))
+
+    def test_run_with_many_literals(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "access.log"
+            p.write_text("".join(f"ip=10.1.{i // 256}.{i % 256} user=u{i}\n" for i in range(3000)), encoding="utf-8")
+            blocklist = [f"ip=10.9.{i // 256}.{i % 256} " for i in range(5000)]
+            blocklist += ["ip=10.1.0.7 ", "user=U2999"]
+
+            out = io.StringIO()
+            code = run(blocklist, str(p), ignore_case=False, regex=False, count=False, line_numbers=True,
+                       stdout=out, stderr=io.StringIO())
+            self.assertEqual(code, 0)
+            self.assertEqual(out.getvalue(), "8:ip=10.1.0.7 user=u7\n")
+
+            out = io.StringIO()
+            run(blocklist, str(p), ignore_case=True, regex=False, count=True, line_numbers=False,
+                stdout=out, stderr=io.StringIO())
+            self.assertEqual(out.getvalue(), "2\n")
+
+    def test_engine_takes_pattern_sequences(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.txt"
+            p.write_text("alpha\nbeta\ngamma\ndelta\n", encoding="utf-8")
+            self.assertEqual(list(iter_matches(str(p), ["gam", "bet"], ignore_case=False, regex=False)),
+                             [(2, b"beta"), (3, b"gamma")])
+            self.assertEqual(list(iter_matches(str(p), ["ALP", "é"], ignore_case=True, regex=False)),
+                             [(1, b"alpha")])
+            self.assertEqual(count_matches(str(p), [r"^a", r"ta$"], ignore_case=False, regex=True), 3)
+            self.assertEqual(count_matches(str(p), [], ignore_case=False, regex=False), 0)
+
+    def test_single_literal_skips_automaton(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.txt"
+            p.write_text("alpha\nBETA\ncafé\n", encoding="utf-8")
+            with mock.patch("mini_grep.AhoCorasick", side_effect=AssertionError("automaton built")):
+                for pattern, ignore_case, expected in (("et", True, [2]), (["et"], True, [2]),
+                                                       ("ET", False, [2]), (["é"], True, [3])):
+                    with self.subTest(pattern=pattern, ignore_case=ignore_case):
+                        hits = iter_matches(str(p), pattern, ignore_case=ignore_case, regex=False)
+                        self.assertEqual([n for n, _ in hits], expected)
+
+    def test_regex_patterns_are_alternated(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.txt"
+            p.write_text("cat\ndog\nzebra\nbird\n", encoding="utf-8")
+            out = io.StringIO()
+            run([r"c.t", r"^z", r"o|i"], str(p), ignore_case=False, regex=True, count=False, line_numbers=False,
+                stdout=out, stderr=io.StringIO())
+            self.assertEqual(out.getvalue(), "cat\ndog\nzebra\nbird\n")
+            out = io.StringIO()
+            code = run([], str(p), ignore_case=False, regex=True, count=False, line_numbers=False,
+                       stdout=out, stderr=io.StringIO())
+            self.assertEqual((code, out.getvalue()), (1, ""))
+
+    def test_main_e_and_f(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.txt"
+            p.write_text("alpha\nbeta\ngamma\ndelta\n", encoding="utf-8")
+            patterns = Path(d) / "patterns.txt"
+            patterns.write_text("gam\n\nlta\n", encoding="utf-8")
+
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = main(["-e", "alp", "-e", "eta", str(p)])
+            self.assertEqual((code, buf.getvalue()), (0, "alpha\nbeta\n"))
+
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = main(["-f", str(patterns), "-e", "beta", "--count", str(p)])
+            self.assertEqual((code, buf.getvalue()), (0, "3\n"))
+
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit):
+                    main(["-e", "alpha"])
+
+    def test_main_options_between_positionals(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.txt"
+            q = Path(d) / "g.txt"
+            p.write_text("alpha\nbeta\n", encoding="utf-8")
+            q.write_text("beta\n", encoding="utf-8")
+
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = main(["beta", "--count", str(p)])
+            self.assertEqual((code, buf.getvalue()), (0, "1\n"))
+
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = main(["-e", "beta", str(p), "--count", str(q)])
+            self.assertEqual((code, buf.getvalue()), (0, f"{p}:1\n{q}:1\n"))
+
+            # '--' ends option parsing: what follows is the pattern and files even if it starts with '-'
+            p.write_text("-x marks\nbeta\n", encoding="utf-8")
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = main(["--", "-x", str(p)])
+            self.assertEqual((code, buf.getvalue()), (0, "-x marks\n"))
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = main(["--count", "-e-x", "--", str(p), str(q)])
+            self.assertEqual((code, buf.getvalue()), (0, f"{p}:1\n{q}:0\n"))
+
+class TestMiniGrepOutputControl(unittest.TestCase):
+    def numbered_file(self, d):
+        p = Path(d) / "f.txt"
+        lines = [f"l{i}" + (" hit" if i in (3, 5, 9) else "") for i in range(1, 11)]
+        p.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return str(p)
+
+    def test_context(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = self.numbered_file(d)
+            code, out, _ = grep("hit", p, line_numbers=True, before_context=1, after_context=1)
+            self.assertEqual(code, 0)
+            self.assertEqual(out, "2-l2\n3:l3 hit\n4-l4\n5:l5 hit\n6-l6\n--\n8-l8\n9:l9 hit\n10-l10\n")
+            _, out, _ = grep("hit", p, before_context=2)
+            self.assertEqual(out, "l1\nl2\nl3 hit\nl4\nl5 hit\n--\nl7\nl8\nl9 hit\n")
+            _, out, _ = grep("hit", [p, p], max_count=1, after_context=1)
+            self.assertEqual(out, f"{p}:l3 hit\n{p}-l4\n--\n{p}:l3 hit\n{p}-l4\n")
+
+    def test_max_count(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = self.numbered_file(d)
+            self.assertEqual(grep("hit", p, max_count=2), (0, "l3 hit\nl5 hit\n", ""))
+            self.assertEqual(grep("hit", p, max_count=2, count=True), (0, "2\n", ""))
+            self.assertEqual(grep("hit", p, max_count=1, after_context=1, line_numbers=True),
+                             (0, "3:l3 hit\n4-l4\n", ""))
+
+    def test_only_matching(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "f.txt"
+            p.write_text("foo bar FOO\nnone\na1b22c333\n", encoding="utf-8")
+            self.assertEqual(grep("foo", str(p), only_matching=True), (0, "foo\n", ""))
+            self.assertEqual(grep("foo", str(p), only_matching=True, ignore_case=True, line_numbers=True),
+                             (0, "1:foo\n1:FOO\n", ""))
+            self.assertEqual(grep(r"\d*", str(p), regex=True, only_matching=True), (0, "1\n22\n333\n", ""))
+            self.assertEqual(grep(["ar", "bar F", "b"], str(p), only_matching=True), (0, "bar F\nb\n", ""))
+
+    def test_quiet(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = self.numbered_file(d)
+            self.assertEqual(grep("hit", p, quiet=True), (0, "", ""))
+            self.assertEqual(grep("zzz", p, quiet=True), (1, "", ""))
+            missing = os.path.join(d, "missing")
+            code, out, err = grep("hit", [missing, p], quiet=True)
+            self.assertEqual((code, out), (0, ""))
+            self.assertTrue(err.startswith(f"minigrep: {missing}: "))
+            self.assertEqual(grep("hit", [missing, p], quiet=True, no_messages=True), (0, "", ""))
+            self.assertEqual(grep("hit", [missing], no_messages=True), (2, "", ""))
+
+    def test_engine_context_and_max_count(self):
+        with tempfile.TemporaryDirectory() as d:
+            # 11-byte lines; the match right after the first 1 MiB makes the chunked reader reach
+            # back into the previous buffer for its before-context
+            lines = [f"row {i:06d}" for i in range(150_000)]
+            k = (1 << 20) // 11 + 1
+            lines[k] = lines[k + 2] = "row MATCH!"
+            data = ("\n".join(lines) + "\n").encode("ascii")
+            plain = Path(d) / "rows.txt"
+            plain.write_bytes(data)
+            packed = Path(d) / "rows.txt.gz"
+            packed.write_bytes(gzip.compress(data))
+
+            for path in (plain, packed):
+                with self.subTest(path=path.name):
+                    got = list(iter_context(str(path), "MATCH", ignore_case=False, regex=False,
+                                            before=3, after=1))
+                    self.assertEqual([(n, m) for n, m, _ in got],
+                                     [(k - 2, False), (k - 1, False), (k, False), (k + 1, True),
+                                      (k + 2, False), (k + 3, True), (k + 4, False)])
+                    self.assertEqual(got[0][2], f"row {k - 3:06d}".encode("ascii"))
+
+                    got = list(iter_context(str(path), "MATCH", ignore_case=False, regex=False,
+                                            before=1, after=2, max_count=1))
+                    self.assertEqual([(n, m) for n, m, _ in got],
+                                     [(k, False), (k + 1, True), (k + 2, False), (k + 3, False)])
+
+                    self.assertEqual(list(iter_matches(str(path), "MATCH", ignore_case=False, regex=False,
+                                                       max_count=1)), [(k + 1, b"row MATCH!")])
+                    self.assertEqual(count_matches(str(path), "row", ignore_case=False, regex=False,
+                                                   max_count=5), 5)
+
+    def test_aho_corasick_finditer(self):
+        ac = AhoCorasick(["ab", "abc", "bcd", "d"])
+        self.assertEqual(list(ac.finditer("xabcdd")), [(1, 4), (4, 5), (5, 6)])
+        self.assertEqual(list(AhoCorasick(["aa"]).finditer("aaaaa")), [(0, 2), (2, 4)])
+        self.assertEqual(list(AhoCorasick(["he"], ignore_case=True).finditer("HeHE")), [(0, 2), (2, 4)])
+        self.assertEqual(list(AhoCorasick(["", "x"]).finditer("axb")), [(1, 2)])
+
+    def test_main_flags(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = self.numbered_file(d)
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = main(["-C", "1", "-B", "0", "-m", "1", "--line-numbers", "hit", p])
+            self.assertEqual((code, buf.getvalue()), (0, "3:l3 hit\n4-l4\n"))
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = main(["-q", "hit", p])
+            self.assertEqual((code, buf.getvalue()), (0, ""))
+
+class TestMiniGrepCompressed(unittest.TestCase):
+    TEXT = "".join(f"line {i}{' ERROR' if i % 1000 == 7 else ''}\n" for i in range(5000)).encode("utf-8")
+
+    def test_each_format(self):
+        with tempfile.TemporaryDirectory() as d:
+            for name, compress in [("a.log.gz", gzip.compress), ("a.log.bz2", bz2.compress), ("a.log.xz", lzma.compress)]:
+                with self.subTest(name=name):
+                    p = Path(d) / name
+                    p.write_bytes(compress(self.TEXT))
+                    code, out, _ = grep("ERROR", str(p), line_numbers=True)
+                    self.assertEqual(code, 0)
+                    self.assertEqual(out.splitlines()[:2], ["8:line 7 ERROR", "1008:line 1007 ERROR"])
+                    self.assertEqual(count_matches(str(p), "ERROR", ignore_case=False, regex=False), 5)
+                    with open_input(str(p)) as f:
+                        self.assertEqual(f.read(), self.TEXT)
+
+    def test_magic_bytes_without_suffix(self):
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / "app.log.1"
+            p.write_bytes(gzip.compress(b"a\nhit\n"))
+            self.assertEqual(list(iter_matches(str(p), "hit", ignore_case=False, regex=False)), [(2, b"hit")])
+            plain = Path(d) / "plain.gz"
+            plain.write_bytes(b"not compressed hit\n")
+            self.assertEqual(grep("hit", str(plain)), (0, "not compressed hit\n", ""))
+
+    def test_corrupt_archive_and_parallel_files(self):
+        with tempfile.TemporaryDirectory() as d:
+            for i in range(4):
+                (Path(d) / f"app.{i}.log.gz").write_bytes(gzip.compress(self.TEXT))
+            bad = Path(d) / "bad.log.gz"
+            bad.write_bytes(gzip.compress(self.TEXT)[:200])
+            code, out, err = grep("ERROR", [d], recursive=True, count=True, jobs=2, include=["*.gz"])
+            self.assertEqual(code, 2)
+            self.assertEqual(out, "".join(f"{os.path.join(d, f'app.{i}.log.gz')}:5\n" for i in range(4)))
+            self.assertTrue(err.startswith(f"minigrep: {bad}: "))
+
 if __name__ == "__main__":
     unittest.main()